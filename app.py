@@ -4,10 +4,15 @@ Retell AI Clone - Main Dashboard with Script Flow Engine
 
 import streamlit as st
 from pathlib import Path
-import json
+import hashlib
+import orjson
 from datetime import datetime
+import atexit
 import logging
+import logging.handlers
+import queue
 import sys
+import uuid
 
 # Add core directory to path
 sys.path.insert(0, str(Path(__file__).parent / 'core'))
@@ -16,18 +21,31 @@ sys.path.insert(0, str(Path(__file__).parent / 'core'))
 from core.script_parser import UniversalScriptParser
 from core.intent_detector import IntentDetector
 from core.ollama_engine import OllamaEngine
-from core.script_flow_engine import ScriptFlowEngine
+from core.script_flow_engine import CompiledScript, ScriptFlowEngine
 import config
 
 # Setup logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
+@st.cache_resource(show_spinner=False)
+def start_log_listener() -> logging.handlers.QueueListener:
+    """Write log records from a background thread (started once per process)"""
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    handlers = [
         logging.FileHandler(config.LOG_FILE),
         logging.StreamHandler()
     ]
-)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    
+    listener = logging.handlers.QueueListener(queue.Queue(-1), *handlers)
+    listener.start()
+    atexit.register(listener.stop)  # flush queued records on shutdown
+    return listener
+
+# Request threads only enqueue records; file and console I/O happen on the
+# listener thread (which applies the real format)
+queue_handler = logging.handlers.QueueHandler(start_log_listener().queue)
+queue_handler.setFormatter(logging.Formatter('%(message)s'))
+logging.basicConfig(level=logging.INFO, handlers=[queue_handler])
 logger = logging.getLogger(__name__)
 
 # ============================================================================
@@ -45,6 +63,10 @@ st.set_page_config(
 # SESSION STATE INITIALIZATION
 # ============================================================================
 
+# Bound once so the page and handlers below skip the `st.` module lookup on
+# their many reads (each ss.<field> still goes through the proxy)
+ss = st.session_state
+
 def initialize_session_state():
     """Initialize all session state variables"""
     defaults = {
@@ -58,12 +80,13 @@ def initialize_session_state():
         'conversation_history': [],
         'call_active': False,
         'conversation_log': [],
+        'conversation_log_file': None,
         'call_type': 'outbound'
     }
     
     for key, value in defaults.items():
-        if key not in st.session_state:
-            st.session_state[key] = value
+        if key not in ss:
+            ss[key] = value
 
 initialize_session_state()
 
@@ -71,6 +94,21 @@ initialize_session_state()
 # HELPER FUNCTIONS
 # ============================================================================
 
+# Phrases that hint at the call direction when metadata doesn't say
+INBOUND_INDICATORS = (
+    'thank you for calling',
+    'thanks for calling',
+    'how can i help you',
+    'customer support'
+)
+
+OUTBOUND_INDICATORS = (
+    'may i speak with',
+    'is this',
+    'calling from',
+    'i\'m calling'
+)
+
 def detect_call_type(script_metadata: dict, script_text: str) -> str:
     """Detect if inbound or outbound call"""
     script_lower = script_text.lower()
@@ -84,58 +122,65 @@ def detect_call_type(script_metadata: dict, script_text: str) -> str:
             return 'outbound'
     
     # Check content
-    inbound_indicators = [
-        'thank you for calling',
-        'thanks for calling',
-        'how can i help you',
-        'customer support'
-    ]
-    
-    outbound_indicators = [
-        'may i speak with',
-        'is this',
-        'calling from',
-        'i\'m calling'
-    ]
-    
-    inbound_score = sum(1 for indicator in inbound_indicators if indicator in script_lower)
-    outbound_score = sum(1 for indicator in outbound_indicators if indicator in script_lower)
+    inbound_score = len([indicator for indicator in INBOUND_INDICATORS if indicator in script_lower])
+    outbound_score = len([indicator for indicator in OUTBOUND_INDICATORS if indicator in script_lower])
     
     return 'inbound' if inbound_score > outbound_score else 'outbound'
 
+@st.cache_resource(show_spinner=False)
+def parse_script(script_hash: str, _script_text: str) -> UniversalScriptParser:
+    """Parse a script once per distinct text (shared across sessions)"""
+    return UniversalScriptParser(_script_text)
+
+@st.cache_resource(show_spinner=False)
+def compile_script(script_hash: str, _parsed_script: dict) -> CompiledScript:
+    """Build the read-only flow tables once per distinct script (shared across sessions)"""
+    return CompiledScript(_parsed_script)
+
+@st.cache_resource(show_spinner=False)
+def get_intent_detector(fuzzy_threshold: int) -> IntentDetector:
+    """Create the stateless intent detector once per process"""
+    return IntentDetector(fuzzy_threshold=fuzzy_threshold)
+
+@st.cache_resource(show_spinner=False)
+def get_ollama_engine() -> OllamaEngine:
+    """Connect to Ollama once per process instead of on every script load"""
+    return OllamaEngine(config)
+
 def load_script(script_text: str):
     """Load and parse script with flow engine"""
     try:
         with st.spinner("Parsing script..."):
-            # Parse script
-            parser = UniversalScriptParser(script_text)
-            st.session_state.script_parser = parser
-            st.session_state.parsed_script = parser.to_dict()
+            # Parse script (cached by content hash)
+            script_hash = hashlib.blake2b(script_text.encode('utf-8')).hexdigest()
+            parser = parse_script(script_hash, script_text)
+            ss.script_parser = parser
+            ss.parsed_script = parser.to_dict()
             
             # Detect call type
-            st.session_state.call_type = detect_call_type(
-                st.session_state.parsed_script['metadata'],
+            ss.call_type = detect_call_type(
+                ss.parsed_script['metadata'],
                 script_text
             )
             
-            # Add call_type to metadata
-            st.session_state.parsed_script['metadata']['call_type'] = st.session_state.call_type
+            # Add call_type to metadata (copied: the cached parser is shared)
+            ss.parsed_script['metadata'] = {
+                **ss.parsed_script['metadata'],
+                'call_type': ss.call_type
+            }
             
-            logger.info(f"Detected call type: {st.session_state.call_type}")
+            logger.info(f"Detected call type: {ss.call_type}")
             
-            # Initialize intent detector
-            st.session_state.intent_detector = IntentDetector(
-                fuzzy_threshold=config.FUZZY_THRESHOLD
-            )
-            
-            # Initialize Ollama engine
-            st.session_state.ollama_engine = OllamaEngine(config)
+            # Intent detector and Ollama engine are stateless, share them
+            ss.intent_detector = get_intent_detector(config.FUZZY_THRESHOLD)
+            ss.ollama_engine = get_ollama_engine()
             
-            # Initialize Flow Engine (NEW!)
-            st.session_state.flow_engine = ScriptFlowEngine(st.session_state.parsed_script)
+            # Flow engine holds per-call state, so each session gets its own
+            # engine over the shared compiled script
+            ss.flow_engine = ScriptFlowEngine(compile_script(script_hash, ss.parsed_script))
             
-            st.session_state.script_loaded = True
-            st.session_state.script_text = script_text
+            ss.script_loaded = True
+            ss.script_text = script_text
             
             logger.info("Script loaded successfully with flow engine")
             return True
@@ -145,27 +190,42 @@ def load_script(script_text: str):
         st.error(f"Error loading script: {str(e)}")
         return False
 
+def append_to_conversation(*messages: dict):
+    """Add messages to the history and append them to the call's JSONL log"""
+    ss.conversation_history.extend(messages)
+    
+    log_file = ss.conversation_log_file
+    if log_file:
+        with open(log_file, 'ab') as f:
+            f.write(b''.join(orjson.dumps(message, option=orjson.OPT_APPEND_NEWLINE) for message in messages))
+
 def start_call():
     """Start a new call using flow engine"""
-    st.session_state.call_active = True
-    st.session_state.conversation_history = []
+    ss.call_active = True
+    ss.conversation_history = []
+    
+    # One JSONL file per call, appended to as the conversation happens; the
+    # random suffix keeps calls started in the same second in separate files
+    log_file = config.LOGS_DIR / f"conversation_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}.jsonl"
+    log_file.parent.mkdir(parents=True, exist_ok=True)
+    ss.conversation_log_file = log_file
     
     # Reset flow engine
-    st.session_state.flow_engine.reset()
+    ss.flow_engine.reset()
     
     # Get opening from flow engine
-    opening_context = st.session_state.flow_engine.start_conversation()
+    opening_context = ss.flow_engine.start_conversation()
     opening_msg = opening_context['agent_line']
     
     # If empty, use default
     if not opening_msg or len(opening_msg.strip()) < 5:
-        if st.session_state.call_type == 'inbound':
+        if ss.call_type == 'inbound':
             opening_msg = "Thank you for calling! How can I help you today?"
         else:
             opening_msg = "Hello, this is calling. Is this a good time to talk?"
     
     # Add to conversation
-    st.session_state.conversation_history.append({
+    append_to_conversation({
         'role': 'assistant',
         'content': opening_msg,
         'timestamp': datetime.now().isoformat(),
@@ -173,39 +233,41 @@ def start_call():
         'phase': opening_context['phase']
     })
     
-    logger.info(f"Call started - Type: {st.session_state.call_type}, Section: {opening_context['section']}")
+    logger.info(f"Call started - Type: {ss.call_type}, Section: {opening_context['section']}")
 
 def end_call():
     """End current call"""
     # Log conversation
     log_entry = {
         'timestamp': datetime.now().isoformat(),
-        'call_type': st.session_state.call_type,
-        'conversation': st.session_state.conversation_history,
-        'total_messages': len(st.session_state.conversation_history),
-        'progress': st.session_state.flow_engine.get_progress()
+        'call_type': ss.call_type,
+        'conversation': ss.conversation_history,
+        'total_messages': len(ss.conversation_history),
+        'progress': ss.flow_engine.get_progress()
     }
-    st.session_state.conversation_log.append(log_entry)
+    ss.conversation_log.append(log_entry)
     
-    # Save to file
-    log_file = config.LOGS_DIR / f"conversation_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-    log_file.parent.mkdir(parents=True, exist_ok=True)
-    with open(log_file, 'w') as f:
-        json.dump(log_entry, f, indent=2)
+    # Messages are already in the call's log file; close it with a summary line
+    log_file = ss.conversation_log_file
+    if log_file:
+        summary = {key: value for key, value in log_entry.items() if key != 'conversation'}
+        with open(log_file, 'ab') as f:
+            f.write(orjson.dumps({'event': 'call_ended', **summary}, option=orjson.OPT_APPEND_NEWLINE))
     
-    st.session_state.call_active = False
+    ss.conversation_log_file = None
+    ss.call_active = False
     logger.info("Call ended")
 
 def process_user_message(user_input: str):
     """Process user input using flow engine"""
     try:
         # Step 1: Detect intent
-        intent_data = st.session_state.intent_detector.detect(user_input)
+        intent_data = ss.intent_detector.detect(user_input)
         
         logger.info(f"Intent: {intent_data['primary_intent']}, User said: {user_input}")
         
         # Step 2: Get next step from flow engine (MOST IMPORTANT!)
-        flow_context = st.session_state.flow_engine.get_next_step(
+        flow_context = ss.flow_engine.get_next_step(
             user_input=user_input,
             intent_data=intent_data
         )
@@ -213,29 +275,28 @@ def process_user_message(user_input: str):
         logger.info(f"Flow: Section={flow_context['section']}, Phase={flow_context['phase']}")
         
         # Step 3: Generate response using flow context
-        generation_result = st.session_state.ollama_engine.generate_response(
+        generation_result = ss.ollama_engine.generate_response(
             user_input=user_input,
             intent_data=intent_data,
             flow_context=flow_context,
-            conversation_history=st.session_state.conversation_history,
-            script_metadata=st.session_state.parsed_script['metadata']
+            conversation_history=ss.conversation_history,
+            script_metadata=ss.parsed_script['metadata']
         )
         
         response = generation_result['response']
         
-        # Add to conversation history
-        st.session_state.conversation_history.append({
+        # Add to conversation history (one clock read covers the whole turn)
+        timestamp = datetime.now().isoformat()
+        append_to_conversation({
             'role': 'user',
             'content': user_input,
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': timestamp,
             'intent': intent_data['primary_intent'],
             'sentiment': intent_data['sentiment']
-        })
-        
-        st.session_state.conversation_history.append({
+        }, {
             'role': 'assistant',
             'content': response,
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': timestamp,
             'confidence': generation_result.get('confidence', 0.0),
             'method': generation_result.get('method', 'generated'),
             'section': flow_context['section'],
@@ -248,10 +309,32 @@ def process_user_message(user_input: str):
         logger.error(f"Error processing message: {e}", exc_info=True)
         return "I apologize, but I'm having trouble processing that. Could you please repeat?"
 
+def render_progress(placeholder):
+    """Draw call progress into a placeholder so it can be refreshed in place"""
+    progress = ss.flow_engine.get_progress()
+    
+    with placeholder.container():
+        st.metric("Progress", f"{progress['progress_percentage']:.0f}%")
+        st.progress(progress['progress_percentage'] / 100)
+        
+        with st.expander("📍 Current Position"):
+            st.write(f"**Section:** {progress['current_section']}")
+            st.write(f"**Phase:** {progress['phase']}")
+            st.write(f"**Completed:** {len(progress['completed_sections'])}/{progress['total_sections']}")
+
+def render_section_caption(placeholder):
+    """Show the current section under the title (refreshable in place)"""
+    progress = ss.flow_engine.get_progress()
+    placeholder.caption(f"📍 **Current Section:** {progress['current_section']} | **Phase:** {progress['phase']}")
+
 # ============================================================================
 # SIDEBAR
 # ============================================================================
 
+# Placeholders refreshed after each turn instead of rerunning the whole page
+progress_placeholder = None
+section_caption_placeholder = None
+
 with st.sidebar:
     st.title("🤖 Retell AI Clone")
     st.caption("Script-Aware Call Agent")
@@ -294,10 +377,10 @@ with st.sidebar:
     st.divider()
     
     # Call Controls
-    if st.session_state.script_loaded:
+    if ss.script_loaded:
         st.subheader("📞 Call Controls")
         
-        if not st.session_state.call_active:
+        if not ss.call_active:
             if st.button("▶️ Start Call", type="primary", use_container_width=True):
                 start_call()
                 st.rerun()
@@ -310,7 +393,7 @@ with st.sidebar:
             with col2:
                 if st.button("🔄 Reset", use_container_width=True):
                     end_call()
-                    st.session_state.conversation_history = []
+                    ss.conversation_history = []
                     st.rerun()
         
         st.divider()
@@ -319,23 +402,16 @@ with st.sidebar:
         st.subheader("📊 Script Info")
         
         # Call type
-        call_type_emoji = "📞" if st.session_state.call_type == 'inbound' else "📱"
-        st.info(f"{call_type_emoji} **Call Type:** {st.session_state.call_type.upper()}")
+        call_type_emoji = "📞" if ss.call_type == 'inbound' else "📱"
+        st.info(f"{call_type_emoji} **Call Type:** {ss.call_type.upper()}")
         
         # Progress (if call active)
-        if st.session_state.call_active and st.session_state.flow_engine:
-            progress = st.session_state.flow_engine.get_progress()
-            
-            st.metric("Progress", f"{progress['progress_percentage']:.0f}%")
-            st.progress(progress['progress_percentage'] / 100)
-            
-            with st.expander("📍 Current Position"):
-                st.write(f"**Section:** {progress['current_section']}")
-                st.write(f"**Phase:** {progress['phase']}")
-                st.write(f"**Completed:** {len(progress['completed_sections'])}/{progress['total_sections']}")
+        if ss.call_active and ss.flow_engine:
+            progress_placeholder = st.empty()
+            render_progress(progress_placeholder)
         
         # Metadata
-        metadata = st.session_state.parsed_script.get('metadata', {})
+        metadata = ss.parsed_script.get('metadata', {})
         if metadata:
             with st.expander("📋 Script Details"):
                 for key, value in metadata.items():
@@ -347,19 +423,19 @@ with st.sidebar:
 # ============================================================================
 
 # Title
-if st.session_state.script_loaded and st.session_state.call_active:
-    call_type_text = "📞 Inbound" if st.session_state.call_type == 'inbound' else "📱 Outbound"
+if ss.script_loaded and ss.call_active:
+    call_type_text = "📞 Inbound" if ss.call_type == 'inbound' else "📱 Outbound"
     st.title(f"💬 Call Agent Conversation ({call_type_text})")
     
     # Show current section prominently
-    if st.session_state.flow_engine:
-        progress = st.session_state.flow_engine.get_progress()
-        st.caption(f"📍 **Current Section:** {progress['current_section']} | **Phase:** {progress['phase']}")
+    if ss.flow_engine:
+        section_caption_placeholder = st.empty()
+        render_section_caption(section_caption_placeholder)
 else:
     st.title("💬 Call Agent Conversation")
 
 # Instructions
-if not st.session_state.script_loaded:
+if not ss.script_loaded:
     st.info("👈 Please upload and load a script to begin")
     
     st.subheader("📝 How It Works")
@@ -381,12 +457,12 @@ if not st.session_state.script_loaded:
     
     st.stop()
 
-if not st.session_state.call_active:
+if not ss.call_active:
     st.info("📞 Click 'Start Call' in the sidebar to begin")
     st.stop()
 
 # Display conversation
-for message in st.session_state.conversation_history:
+for message in ss.conversation_history:
     role = message['role']
     content = message['content']
     
@@ -414,9 +490,13 @@ if prompt := st.chat_input("Type your message..."):
             st.write(response)
             
             # Show section
-            if st.session_state.flow_engine:
-                progress = st.session_state.flow_engine.get_progress()
+            if ss.flow_engine:
+                progress = ss.flow_engine.get_progress()
                 st.caption(f"📍 {progress['current_section']} | {progress['phase']}")
     
-    # Rerun to update conversation
-    st.rerun()
\ No newline at end of file
+    # The new turn is already on screen; refresh progress in place rather
+    # than rerunning the script and redrawing the whole history
+    if progress_placeholder is not None:
+        render_progress(progress_placeholder)
+    if section_caption_placeholder is not None:
+        render_section_caption(section_caption_placeholder)
\ No newline at end of file
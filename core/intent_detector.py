@@ -8,12 +8,44 @@ Detects user intent from complex sentences, handles:
 """
 
 import re
+from functools import lru_cache
+from types import MappingProxyType
 from typing import Dict, List, Tuple
-from fuzzywuzzy import fuzz
+from rapidfuzz import fuzz, process
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Word tokens for get_keywords
+_TOKEN_RE = re.compile(r'\b\w+\b')
+
+# Words that start a question (used by _is_question)
+_QUESTION_WORDS = frozenset({
+    'what', 'when', 'where', 'who', 'why', 'how', 'can', 'could', 'would'
+})
+
+# Sentiment implied by a strong (> 0.5) intent, in priority order
+_SENTIMENT_BY_INTENT = (
+    ('FRUSTRATED', 'NEGATIVE'),
+    ('OBJECTION', 'NEGATIVE'),
+    ('POSITIVE', 'POSITIVE'),
+    ('UNCERTAIN', 'UNCERTAIN'),
+)
+
+# Stop words dropped by get_keywords
+_STOP_WORDS = frozenset({
+    'i', 'me', 'my', 'myself', 'we', 'our', 'ours', 'ourselves', 'you',
+    'your', 'yours', 'yourself', 'yourselves', 'he', 'him', 'his', 'himself',
+    'she', 'her', 'hers', 'herself', 'it', 'its', 'itself', 'they', 'them',
+    'their', 'theirs', 'themselves', 'what', 'which', 'who', 'whom', 'this',
+    'that', 'these', 'those', 'am', 'is', 'are', 'was', 'were', 'be', 'been',
+    'being', 'have', 'has', 'had', 'having', 'do', 'does', 'did', 'doing',
+    'a', 'an', 'the', 'and', 'but', 'if', 'or', 'because', 'as', 'until',
+    'while', 'of', 'at', 'by', 'for', 'with', 'about', 'against', 'between',
+    'into', 'through', 'during', 'before', 'after', 'above', 'below', 'to',
+    'from', 'up', 'down', 'in', 'out', 'on', 'off', 'over', 'under', 'again'
+})
+
 
 class IntentDetector:
     """
@@ -72,8 +104,39 @@ class IntentDetector:
         'time': r'\b\d{1,2}:\d{2}\s*(?:am|pm)?\b'
     }
     
-    def __init__(self, fuzzy_threshold: int = 80):
+    # Compiled once. Kept as separate patterns: the amount pattern also
+    # matches inside phones and times, which a single alternation would drop
+    _ENTITY_RES = {
+        entity_type: re.compile(pattern, re.IGNORECASE)
+        for entity_type, pattern in ENTITY_PATTERNS.items()
+    }
+    _NAME_RE = re.compile(r'\b[A-Z][a-z]+\b')
+    
+    def __init__(self, fuzzy_threshold: int = 80, cache_size: int = 512):
         self.fuzzy_threshold = fuzzy_threshold
+        
+        # Short replies ("yes", "ok", "tell me more") repeat a lot, so the
+        # pure detection step is memoized per instance
+        self._detect_cached = lru_cache(maxsize=cache_size)(self._detect_uncached)
+        
+        # Flatten INTENT_PATTERNS once so scoring walks flat tables instead
+        # of the nested dict on every turn
+        self._terms = [
+            (term, intent, weight)
+            for intent, patterns in self.INTENT_PATTERNS.items()
+            for key, weight in (('keywords', 1.0), ('phrases', 1.5))
+            for term in patterns[key]
+        ]
+        self._keywords = [
+            (keyword, intent)
+            for intent, patterns in self.INTENT_PATTERNS.items()
+            for keyword in patterns['keywords']
+        ]
+        self._keyword_texts = [keyword for keyword, _ in self._keywords]
+        self._max_possible = {
+            intent: len(patterns['keywords']) + len(patterns['phrases'])
+            for intent, patterns in self.INTENT_PATTERNS.items()
+        }
     
     def detect(self, user_input: str) -> Dict:
         """
@@ -89,146 +152,148 @@ class IntentDetector:
                 'is_question': bool
             }
         """
-        user_lower = user_input.lower().strip()
+        # Entities and names are case-sensitive, so the key keeps the case.
+        # The cached result is read-only and shared by every session, so
+        # each caller gets its own copies of the containers in it.
+        cached = self._detect_cached(user_input.strip())
+        result = dict(cached)
+        result['all_intents'] = list(cached['all_intents'])
+        result['entities'] = {
+            entity_type: list(value) if isinstance(value, tuple) else value
+            for entity_type, value in cached['entities'].items()
+        }
+        
+        logger.info(f"Intent detection: {result['primary_intent']} (confidence: {result['confidence']:.2f})")
+        
+        return result
+    
+    def _detect_uncached(self, user_input: str) -> MappingProxyType:
+        """
+        Run intent, entity and sentiment detection (memoized by detect).
+        The result is cached and shared, so it is built read-only: mappings
+        are proxies and lists are tuples.
+        """
+        # detect() already stripped the input; lowercase it once for every
+        # case-insensitive check below
+        user_lower = user_input.lower()
+        words = user_lower.split()
         
         # Detect all intents
-        intent_scores = self._score_all_intents(user_lower)
+        intent_scores = self._score_all_intents(user_lower, words)
         
         # Extract entities
         entities = self._extract_entities(user_input)
         
-        # Determine primary intent
-        primary_intent = max(intent_scores, key=intent_scores.get) if intent_scores else 'NEUTRAL'
-        primary_confidence = intent_scores.get(primary_intent, 0.0)
-        
-        # Get all intents above threshold
-        all_intents = [
-            intent for intent, score in intent_scores.items()
-            if score >= 0.5
-        ]
+        # Determine primary intent (first best wins ties) and collect all
+        # intents above threshold in the same pass
+        primary_intent = 'NEUTRAL'
+        primary_confidence = 0.0
+        all_intents = []
+        for intent, score in intent_scores.items():
+            if score > primary_confidence:
+                primary_intent = intent
+                primary_confidence = score
+            if score >= 0.5:
+                all_intents.append(intent)
         
         # Detect sentiment
-        sentiment = self._detect_sentiment(user_lower, intent_scores)
+        sentiment = self._detect_sentiment(intent_scores, primary_confidence)
         
         # Check if it's a question
-        is_question = self._is_question(user_input)
+        is_question = self._is_question(user_lower, words)
         
         result = {
             'primary_intent': primary_intent,
-            'all_intents': all_intents,
+            'all_intents': tuple(all_intents),
             'confidence': primary_confidence,
-            'entities': entities,
+            'entities': MappingProxyType({
+                entity_type: tuple(value) if isinstance(value, list) else value
+                for entity_type, value in entities.items()
+            }),
             'sentiment': sentiment,
             'is_question': is_question,
             'has_multiple_intents': len(all_intents) > 1
         }
         
-        logger.info(f"Intent detection: {primary_intent} (confidence: {primary_confidence:.2f})")
-        
-        return result
+        return MappingProxyType(result)
     
-    def _score_all_intents(self, user_input: str) -> Dict[str, float]:
-        """Calculate score for each intent"""
-        scores = {}
-        
-        for intent, patterns in self.INTENT_PATTERNS.items():
-            score = 0.0
-            matches = 0
-            
-            # Check exact keyword matches
-            for keyword in patterns['keywords']:
-                if keyword in user_input:
-                    score += 1.0
-                    matches += 1
-            
-            # Check phrase matches
-            for phrase in patterns['phrases']:
-                if phrase in user_input:
-                    score += 1.5
-                    matches += 1
-            
-            # Fuzzy matching for keywords
-            words = user_input.split()
-            for keyword in patterns['keywords']:
-                for word in words:
-                    similarity = fuzz.ratio(keyword, word)
-                    if similarity >= self.fuzzy_threshold:
-                        score += 0.5
-                        matches += 1
-                        break
-            
-            # Normalize score
-            if matches > 0:
-                max_possible = len(patterns['keywords']) + len(patterns['phrases'])
-                scores[intent] = min(score / max_possible, 1.0)
-        
-        return scores
+    def _score_all_intents(self, user_input: str, words: List[str]) -> Dict[str, float]:
+        """Calculate score for each intent (words: user_input.split())"""
+        raw_scores = {}
+        matches = {}
+        
+        # Check exact keyword (1.0) and phrase (1.5) matches
+        for term, intent, weight in self._terms:
+            if term in user_input:
+                raw_scores[intent] = raw_scores.get(intent, 0.0) + weight
+                matches[intent] = matches.get(intent, 0) + 1
+        
+        # Fuzzy matching for keywords: one keyword x word similarity matrix,
+        # each keyword counts once if any word clears the threshold
+        similarity = process.cdist(
+            self._keyword_texts, words,
+            scorer=fuzz.ratio, score_cutoff=self.fuzzy_threshold
+        )
+        fuzzy_hits = (similarity >= self.fuzzy_threshold).any(axis=1)
+        for (keyword, intent), hit in zip(self._keywords, fuzzy_hits):
+            if hit:
+                raw_scores[intent] = raw_scores.get(intent, 0.0) + 0.5
+                matches[intent] = matches.get(intent, 0) + 1
+        
+        # Normalize score (keep INTENT_PATTERNS order for tie-breaking)
+        return {
+            intent: min(raw_scores[intent] / max_possible, 1.0)
+            for intent, max_possible in self._max_possible.items()
+            if matches.get(intent)
+        }
     
     def _extract_entities(self, text: str) -> Dict:
         """Extract entities like amounts, dates, emails"""
         entities = {}
         
-        for entity_type, pattern in self.ENTITY_PATTERNS.items():
-            matches = re.findall(pattern, text, re.IGNORECASE)
+        for entity_type, pattern in self._ENTITY_RES.items():
+            matches = pattern.findall(text)
             if matches:
                 entities[entity_type] = matches[0] if len(matches) == 1 else matches
         
         # Extract potential names (capitalized words)
-        names = re.findall(r'\b[A-Z][a-z]+\b', text)
+        names = self._NAME_RE.findall(text)
         if names:
             entities['potential_names'] = names
         
         return entities
     
-    def _detect_sentiment(self, user_input: str, intent_scores: Dict) -> str:
+    def _detect_sentiment(self, intent_scores: Dict, primary_confidence: float) -> str:
         """Detect overall sentiment"""
-        # Check for negative sentiment
-        if intent_scores.get('FRUSTRATED', 0) > 0.5 or intent_scores.get('OBJECTION', 0) > 0.5:
-            return 'NEGATIVE'
+        # No intent can clear 0.5 unless the strongest one does
+        if primary_confidence <= 0.5:
+            return 'NEUTRAL'
         
-        # Check for positive sentiment
-        if intent_scores.get('POSITIVE', 0) > 0.5:
-            return 'POSITIVE'
-        
-        # Check for uncertainty
-        if intent_scores.get('UNCERTAIN', 0) > 0.5:
-            return 'UNCERTAIN'
+        # Negative beats positive beats uncertain
+        for intent, sentiment in _SENTIMENT_BY_INTENT:
+            if intent_scores.get(intent, 0) > 0.5:
+                return sentiment
         
         # Neutral
         return 'NEUTRAL'
     
-    def _is_question(self, text: str) -> bool:
-        """Check if input is a question"""
+    def _is_question(self, user_lower: str, words: List[str]) -> bool:
+        """Check if (already lowercased and split) input is a question"""
         # Has question mark
-        if '?' in text:
+        if '?' in user_lower:
             return True
         
         # Starts with question word
-        question_words = ['what', 'when', 'where', 'who', 'why', 'how', 'can', 'could', 'would']
-        first_word = text.lower().split()[0] if text.split() else ''
+        first_word = words[0] if words else ''
         
-        return first_word in question_words
+        return first_word in _QUESTION_WORDS
     
     def get_keywords(self, user_input: str) -> List[str]:
         """Extract important keywords from user input"""
-        # Remove stop words
-        stop_words = {
-            'i', 'me', 'my', 'myself', 'we', 'our', 'ours', 'ourselves', 'you',
-            'your', 'yours', 'yourself', 'yourselves', 'he', 'him', 'his', 'himself',
-            'she', 'her', 'hers', 'herself', 'it', 'its', 'itself', 'they', 'them',
-            'their', 'theirs', 'themselves', 'what', 'which', 'who', 'whom', 'this',
-            'that', 'these', 'those', 'am', 'is', 'are', 'was', 'were', 'be', 'been',
-            'being', 'have', 'has', 'had', 'having', 'do', 'does', 'did', 'doing',
-            'a', 'an', 'the', 'and', 'but', 'if', 'or', 'because', 'as', 'until',
-            'while', 'of', 'at', 'by', 'for', 'with', 'about', 'against', 'between',
-            'into', 'through', 'during', 'before', 'after', 'above', 'below', 'to',
-            'from', 'up', 'down', 'in', 'out', 'on', 'off', 'over', 'under', 'again'
-        }
-        
         # Tokenize
-        words = re.findall(r'\b\w+\b', user_input.lower())
+        words = _TOKEN_RE.findall(user_input.lower())
         
         # Filter stop words and short words
-        keywords = [w for w in words if w not in stop_words and len(w) > 2]
+        keywords = [w for w in words if w not in _STOP_WORDS and len(w) > 2]
         
         return keywords
\ No newline at end of file
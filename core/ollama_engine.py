@@ -2,32 +2,224 @@
 Ollama Engine - Generate responses using local Ollama with Script Flow Awareness
 """
 
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+import re
+import threading
+import httpx
+import numpy as np
 import ollama
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple, Union
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Speaker labels stripped from the start of a line, in the order the old
+# strip loops tried them (each is removed at most once)
+_SCRIPT_PREFIXES = ("Agent:", "Agent (Clare):", "Clare:", "Assistant:", "Agent (", "Response:")
+_RESPONSE_PREFIXES = (
+    "Agent: ", "Assistant: ", "Response: ", "Clare: ", "Agent (Clare): ", "Agent (Clare):", "Agent:"
+)
+
+# One optional group per label, so a single match strips a run of them
+# (script lines also drop a ")" left behind by "Agent (")
+_SCRIPT_PREFIX_RE = re.compile(''.join(
+    rf'(?:{re.escape(prefix)}\s*(?:\)\s*)?)?' for prefix in _SCRIPT_PREFIXES
+))
+_RESPONSE_PREFIX_RE = re.compile(''.join(
+    rf'(?:{re.escape(prefix)}\s*)?' for prefix in _RESPONSE_PREFIXES
+))
+
+# Quantization part of a model tag, e.g. "7b-instruct-q4_K_M" or "7b-fp16"
+_QUANT_TAG_RE = re.compile(r'(?:^|[-_])(?:i?q\d\w*|fp?16|bf16|fp?32)$', re.IGNORECASE)
+
+# Decoding stops where the model starts writing the next turn or another
+# prompt block instead of ending its reply
+_STOP_SEQUENCES = ["\nCustomer:", "\n===", "###", "</response>"]
+
+# Transcript labels for the prompt (anything but the agent is the customer)
+_ROLE_LABELS = {'assistant': 'Agent'}
+
+# Closing block of the user prompt, with and without a script line to say
+_EXACT_LINE_INSTRUCTION = (
+    "=== YOUR COMPLETE RESPONSE (SAY THIS EXACTLY) ===\n"
+    '"{exact_line}"\n'
+    "\n"
+    "🎯 Use the COMPLETE line above as your response.\n"
+    "   Do not shorten it. Do not split it. Say it all."
+)
+_FREE_RESPONSE_INSTRUCTION = (
+    "=== YOUR RESPONSE ===\n"
+    "Respond briefly and naturally to continue the conversation."
+)
+
+# Unpunctuated lines starting with one of these words (or its "n't"
+# form) get a question mark
+_QUESTION_START_RE = re.compile(
+    r"\s*(?:who|what|when|where|why|how|is|are|can|could|would|do|does|may|might)"
+    r"(?:n['’]t)?\b",
+    re.IGNORECASE
+)
+
+
+def _ensure_terminal_punctuation(text: str) -> str:
+    """Add '?' or '.' to text that doesn't already end a sentence"""
+    if text and text[-1] not in '.!?':
+        text += '?' if _QUESTION_START_RE.match(text) else '.'
+    return text
+
+
+@lru_cache(maxsize=1024)
+def _clean_script_line(script_line: str) -> str:
+    """
+    Clean a script line for delivery (see _clean_and_prepare_script_line).
+    Scripts repeat the same lines across turns and calls, so each distinct
+    line is cleaned once.
+    """
+    if not script_line:
+        return ""
+    
+    # Remove surrounding quotes
+    if script_line.startswith('"') and script_line.endswith('"'):
+        script_line = script_line[1:-1]
+    
+    # Remove agent name prefixes if present (most lines have none, and
+    # the tuple startswith rules that out in one C call)
+    if script_line.startswith(_SCRIPT_PREFIXES):
+        script_line = script_line[_SCRIPT_PREFIX_RE.match(script_line).end():]
+    
+    # Remove extra quotes that might be inside
+    script_line = script_line.replace('""', '"')
+    
+    # Clean up whitespace
+    script_line = ' '.join(script_line.split())
+    
+    # Ensure ends with punctuation if it doesn't already
+    return _ensure_terminal_punctuation(script_line)
+
+
+@lru_cache(maxsize=512)
+def _build_system_prompt(agent_name: str, tone: str, call_type: str) -> str:
+    """Format the static system prompt (once per distinct script persona)"""
+    return f"""You are {agent_name}, a professional call center agent following a precise script.
+
+🎯 CRITICAL INSTRUCTIONS:
+1. You MUST say EXACTLY what's in the script line you are given
+2. Use the COMPLETE script line provided - do not shorten or split it
+3. Do NOT add extra information not in the script
+4. Do NOT skip any part of the script
+5. Only make tiny adjustments for natural flow (like "Great!" before the script)
+
+CALL:
+- Call Type: {call_type.upper()}
+- Tone: {tone}
+
+WHAT TO DO:
+- Say the complete script line word-for-word
+- Keep it natural and conversational
+- Follow the script precisely
+- Do not split this into multiple parts
+- Say it all in one response
+
+Remember: Script compliance is critical. Say the COMPLETE line."""
+
+
+@dataclass(frozen=True, slots=True)
+class FlowContext:
+    """The parts of a ScriptFlowEngine step that response generation reads"""
+    section: str = 'unknown'
+    phase: str = 'unknown'
+    agent_line: str = ''
+    type: str = 'CONVERSATION'
+    
+    @classmethod
+    def from_dict(cls, flow_context: Dict[str, Any]) -> 'FlowContext':
+        """Build from a flow engine step dict (extra keys are ignored)"""
+        return cls(
+            section=flow_context.get('section', 'unknown'),
+            phase=flow_context.get('phase', 'unknown'),
+            agent_line=flow_context.get('agent_line', ''),
+            type=flow_context.get('type', 'CONVERSATION')
+        )
+    
+    @classmethod
+    def coerce(cls, flow_context: Union['FlowContext', Dict[str, Any]]) -> 'FlowContext':
+        """Accept either a FlowContext or a flow engine step dict"""
+        if isinstance(flow_context, cls):
+            return flow_context
+        return cls.from_dict(flow_context)
+
 
 class OllamaEngine:
     """Handle Ollama LLM interactions with script flow awareness"""
     
-    def __init__(self, config):
-        """Initialize Ollama engine"""
+    def __init__(self, config, client: Optional[ollama.Client] = None):
+        """Initialize Ollama engine (optionally on an existing client)"""
         self.config = config
         self.model = config.OLLAMA_MODEL
         self.temperature = config.OLLAMA_TEMPERATURE
         self.max_tokens = config.OLLAMA_MAX_TOKENS
         self.host = config.OLLAMA_HOST
+        self.keep_alive = config.OLLAMA_KEEP_ALIVE
+        self.num_parallel = config.OLLAMA_NUM_PARALLEL
+        
+        # Generated replies keyed by (script persona, flow context, input),
+        # plus input embeddings per script position for paraphrase hits.
+        # The engine is shared across sessions and scripts, so access is
+        # locked and the persona keeps scripts from sharing replies.
+        self.cache_size = config.RESPONSE_CACHE_SIZE
+        self.embed_model = config.RESPONSE_CACHE_EMBED_MODEL
+        self.similarity_threshold = config.RESPONSE_CACHE_SIMILARITY
+        self._response_cache: OrderedDict = OrderedDict()
+        self._semantic_index: Dict[Tuple, Dict[Tuple, np.ndarray]] = {}
+        self._embeddings: OrderedDict = OrderedDict()
+        self._cache_lock = threading.Lock()
+        
+        # Set once the model is on the server; until then turns that need
+        # the model get the script-line fallback
+        self._model_ready = threading.Event()
+        
+        # One pooled client per engine so every turn reuses keep-alive
+        # connections instead of the module-level default client
+        self.client = client or self._build_client()
         
         # Verify connection
-        self._verify_connection()
+        if self._verify_connection():
+            self._model_ready.set()
+        
+        # Pulling a missing model takes minutes and loading one seconds, so
+        # both happen in the background while scripted turns are served
+        threading.Thread(
+            target=self._prepare_model, name='ollama-model-prepare', daemon=True
+        ).start()
+    
+    def _build_client(self) -> ollama.Client:
+        """Create an Ollama client with a bounded keep-alive connection pool"""
+        # Pool limits live on the transport once one is supplied
+        transport = httpx.HTTPTransport(
+            retries=self.config.OLLAMA_CONNECT_RETRIES,
+            limits=httpx.Limits(
+                max_connections=self.config.OLLAMA_MAX_CONNECTIONS,
+                max_keepalive_connections=self.config.OLLAMA_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=self.config.OLLAMA_KEEPALIVE_EXPIRY
+            )
+        )
+        return ollama.Client(
+            host=self.host,
+            timeout=httpx.Timeout(
+                self.config.OLLAMA_TIMEOUT,
+                connect=self.config.OLLAMA_CONNECT_TIMEOUT
+            ),
+            transport=transport
+        )
     
-    def _verify_connection(self):
-        """Verify Ollama is running and model is available"""
+    def _verify_connection(self) -> bool:
+        """Verify Ollama is running and report whether the model is available"""
         try:
             # Test connection
-            models_response = ollama.list()
+            models_response = self.client.list()
             logger.info("✅ Connected to Ollama")
             
             # Extract model names safely
@@ -41,23 +233,77 @@ class OllamaEngine:
             
             logger.info(f"📋 Available models: {model_names}")
             
+            if self.config.OLLAMA_PREFER_Q4_K_M:
+                self.model = self._prefer_quantized_model(model_names)
+            logger.info(
+                f"⚙️ Batch workers: {self.num_parallel} "
+                f"(match the server's OLLAMA_NUM_PARALLEL / OLLAMA_MAX_LOADED_MODELS)"
+            )
+            
             # Check if our model is available
             if self.model not in model_names:
-                logger.warning(f"⚠️ Model '{self.model}' not found. Downloading...")
-                ollama.pull(self.model)
-                logger.info(f"✅ Model '{self.model}' downloaded")
-            else:
-                logger.info(f"✅ Model '{self.model}' is available")
+                logger.warning(f"⚠️ Model '{self.model}' not found. Downloading in the background...")
+                return False
+            
+            logger.info(f"✅ Model '{self.model}' is available")
+            return True
                 
         except Exception as e:
             logger.error(f"❌ Ollama connection failed: {e}")
             raise
     
+    def _prefer_quantized_model(self, model_names: List[str]) -> str:
+        """Swap an unquantized model name for an installed Q4_K_M variant"""
+        name, _, tag = self.model.partition(':')
+        if _QUANT_TAG_RE.search(tag):
+            return self.model
+        
+        # "qwen2.5:7b" -> "qwen2.5:7b-instruct-q4_K_M", "qwen2.5" -> "qwen2.5:7b-q4_K_M"
+        prefix = f"{self.model}-" if tag else f"{name}:"
+        variants = [
+            m for m in model_names
+            if m.startswith(prefix) and m.lower().endswith('q4_k_m')
+        ]
+        if variants:
+            choice = min(variants, key=len)
+            logger.info(f"⚡ Using quantized '{choice}' instead of '{self.model}'")
+            return choice
+        
+        logger.warning(
+            f"⚠️ Model '{self.model}' has no quantization tag; consider a Q4_K_M "
+            f"variant for faster decoding"
+        )
+        return self.model
+    
+    def _prepare_model(self):
+        """Pull the model if it is missing, then load it (background thread)"""
+        if not self._model_ready.is_set():
+            try:
+                self.client.pull(self.model)
+            except Exception as e:
+                logger.error(f"❌ Downloading model '{self.model}' failed: {e}")
+                return
+            
+            logger.info(f"✅ Model '{self.model}' downloaded")
+            self._model_ready.set()
+        
+        # Load the model now so the first chat turn doesn't pay for it
+        self._preload_model()
+    
+    def _preload_model(self):
+        """Load the model into memory and keep it there for OLLAMA_KEEP_ALIVE"""
+        try:
+            # An empty prompt only loads the model
+            self.client.generate(model=self.model, prompt='', keep_alive=self.keep_alive)
+            logger.info(f"✅ Model '{self.model}' loaded (keep_alive={self.keep_alive})")
+        except Exception as e:
+            logger.warning(f"⚠️ Model preload failed, first response may be slow: {e}")
+    
     def generate_response(
         self,
         user_input: str,
         intent_data: Dict[str, Any],
-        flow_context: Dict[str, Any],
+        flow_context: Union[FlowContext, Dict[str, Any]],
         conversation_history: List[Dict[str, str]],
         script_metadata: Dict[str, str]
     ) -> Dict[str, Any]:
@@ -67,20 +313,22 @@ class OllamaEngine:
         Args:
             user_input: User's message
             intent_data: Detected intent information
-            flow_context: Context from ScriptFlowEngine (what section we're in, what to say)
+            flow_context: Context from ScriptFlowEngine (what section we're in, what to say),
+                as its step dict or a FlowContext
             conversation_history: Previous messages
             script_metadata: Script metadata (tone, style, etc.)
             
         Returns:
             Dict with response and metadata
         """
+        # Read the flow context once; every branch below uses these fields
+        flow_context = FlowContext.coerce(flow_context)
+        exact_agent_line = flow_context.agent_line
+        
         try:
-            # Get the exact agent line from flow context
-            exact_agent_line = flow_context.get('agent_line', '')
-            
             # 🔥 CRITICAL FIX: Use COMPLETE dialogue without splitting
             # The flow engine gives us the full response for this turn
-            if exact_agent_line and len(exact_agent_line) > 10:
+            if self._is_scripted_line(exact_agent_line):
                 # Clean and use the COMPLETE script line
                 response_text = self._clean_and_prepare_script_line(exact_agent_line, script_metadata)
                 
@@ -90,10 +338,27 @@ class OllamaEngine:
                     'method': 'script_exact',
                     'model': self.model,
                     'fallback_used': False,
-                    'section': flow_context.get('section', 'unknown'),
-                    'phase': flow_context.get('phase', 'unknown')
+                    'section': flow_context.section,
+                    'phase': flow_context.phase
                 }
             
+            # Same reply at the same point in the script: skip the model
+            cache_key = self._cache_key(flow_context, user_input, script_metadata)
+            cached = self._get_cached_response(cache_key)
+            if cached:
+                return {**cached, 'method': 'response_cache'}
+            
+            embedding = self._embed(cache_key[-1])
+            if embedding is not None:
+                cached = self._find_similar_response(cache_key, embedding)
+                if cached:
+                    return {**cached, 'method': 'semantic_cache'}
+            
+            # Model still downloading: answer from the script instead of waiting
+            if not self._model_ready.is_set():
+                logger.warning(f"Model '{self.model}' not ready yet, using script fallback")
+                return self._fallback_response(flow_context, script_metadata)
+            
             # Otherwise, generate with heavy script guidance
             prompt = self._build_flow_aware_prompt(
                 user_input=user_input,
@@ -104,12 +369,17 @@ class OllamaEngine:
             )
             
             # Generate with Ollama
-            response = ollama.chat(
+            response = self.client.chat(
                 model=self.model,
+                keep_alive=self.keep_alive,
                 messages=[
                     {
                         "role": "system",
-                        "content": self._get_flow_aware_system_prompt(script_metadata, flow_context)
+                        "content": self._get_flow_aware_system_prompt(script_metadata)
+                    },
+                    {
+                        "role": "system",
+                        "content": self._get_flow_context_message(flow_context)
                     },
                     {
                         "role": "user",
@@ -121,7 +391,8 @@ class OllamaEngine:
                     "top_p": 0.5,        
                     "top_k": 20,         
                     "repeat_penalty": 1.3,
-                    "num_predict": 200   # Reasonable limit for full responses
+                    "num_predict": self._estimate_num_predict(exact_agent_line),
+                    "stop": _STOP_SEQUENCES
                 }
             )
             
@@ -131,94 +402,236 @@ class OllamaEngine:
             # Clean response
             response_text = self._clean_response(response_text)
             
-            return {
+            result = {
                 'response': response_text,
                 'confidence': 0.85,
                 'method': 'ollama_flow_guided',
                 'model': self.model,
                 'fallback_used': False,
-                'section': flow_context.get('section', 'unknown'),
-                'phase': flow_context.get('phase', 'unknown')
+                'section': flow_context.section,
+                'phase': flow_context.phase
             }
+            self._store_response(cache_key, result, embedding)
+            
+            return result
             
         except Exception as e:
             logger.error(f"Error generating response: {e}")
+            return self._fallback_response(flow_context, script_metadata)
+    
+    def _fallback_response(self, flow_context: FlowContext, script_metadata: Dict[str, str]) -> Dict[str, Any]:
+        """Answer without the model: the script line if there is one"""
+        # Fallback: Use exact script line if available
+        if flow_context.agent_line:
+            fallback_text = self._clean_and_prepare_script_line(
+                flow_context.agent_line,
+                script_metadata
+            )
             
-            # Fallback: Use exact script line if available
-            if flow_context.get('agent_line'):
-                fallback_text = self._clean_and_prepare_script_line(
-                    flow_context['agent_line'],
-                    script_metadata
-                )
-                
-                return {
-                    'response': fallback_text,
-                    'confidence': 1.0,
-                    'method': 'fallback_script_exact',
-                    'fallback_used': True,
-                    'section': flow_context.get('section', 'unknown'),
-                    'phase': flow_context.get('phase', 'unknown')
-                }
-            else:
-                return {
-                    'response': "I apologize, could you please repeat that?",
-                    'confidence': 0.0,
-                    'method': 'fallback_generic',
-                    'fallback_used': True
-                }
+            return {
+                'response': fallback_text,
+                'confidence': 1.0,
+                'method': 'fallback_script_exact',
+                'fallback_used': True,
+                'section': flow_context.section,
+                'phase': flow_context.phase
+            }
+        else:
+            return {
+                'response': "I apologize, could you please repeat that?",
+                'confidence': 0.0,
+                'method': 'fallback_generic',
+                'fallback_used': True
+            }
+    
+    @staticmethod
+    def _estimate_num_predict(exact_agent_line: str) -> int:
+        """Token budget: ~3x the script line's words (40-200), else 200"""
+        if exact_agent_line:
+            return max(40, min(200, len(exact_agent_line.split()) * 3))
+        # Reasonable limit for full free-form responses
+        return 200
+    
+    @staticmethod
+    def _is_scripted_line(agent_line: str) -> bool:
+        """Whether the script line is used as-is (no model call needed)"""
+        return bool(agent_line) and len(agent_line) > 10
+    
+    @staticmethod
+    def _normalize_input(user_input: str) -> str:
+        """Case/whitespace-normalized user input used for cache lookups"""
+        return ' '.join(user_input.lower().split())
+    
+    def _cache_key(
+        self,
+        flow_context: FlowContext,
+        user_input: str,
+        script_metadata: Dict[str, str]
+    ) -> Tuple[Tuple[str, str, str], FlowContext, str]:
+        """
+        Response cache key: (script persona, flow context, normalized input).
+        The persona is what the system prompt is built from, so scripts that
+        share a section name never get each other's replies.
+        """
+        return (
+            self._script_persona(script_metadata),
+            flow_context,
+            self._normalize_input(user_input)
+        )
+    
+    def _get_cached_response(self, key: Tuple) -> Optional[Dict[str, Any]]:
+        """Exact-match lookup (refreshes the entry's LRU position)"""
+        with self._cache_lock:
+            cached = self._response_cache.get(key)
+            if cached is not None:
+                self._response_cache.move_to_end(key)
+        return cached
+    
+    def _embed(self, text: str) -> Optional[np.ndarray]:
+        """Unit-length embedding of text, or None if the semantic cache is off"""
+        return self._embed_batch([text])[0]
+    
+    def _embed_batch(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """
+        Unit-length embeddings for texts (None where unavailable). Texts not
+        embedded before go to /api/embed together in a single request.
+        """
+        if not self.embed_model or self.cache_size <= 0:
+            return [None] * len(texts)
+        
+        with self._cache_lock:
+            vectors = {text: self._embeddings.get(text) for text in texts}
+        missing = [text for text, vector in vectors.items() if vector is None]
+        
+        if missing:
+            try:
+                response = self.client.embed(model=self.embed_model, input=missing, keep_alive=self.keep_alive)
+                matrix = np.asarray(response['embeddings'], dtype=np.float32)
+            except Exception as e:
+                logger.warning(f"⚠️ Embedding failed, semantic cache skipped: {e}")
+                return [vectors[text] for text in texts]
+            
+            norms = np.linalg.norm(matrix, axis=1)
+            with self._cache_lock:
+                for text, vector, norm in zip(missing, matrix, norms):
+                    if norm:
+                        vectors[text] = self._embeddings[text] = vector / norm
+                while len(self._embeddings) > self.cache_size:
+                    self._embeddings.popitem(last=False)
+        
+        return [vectors[text] for text in texts]
+    
+    def _find_similar_response(self, key: Tuple, embedding: np.ndarray) -> Optional[Dict[str, Any]]:
+        """Closest cached input at the same script position, if similar enough"""
+        with self._cache_lock:
+            entries = self._semantic_index.get(key[:2])
+            if not entries:
+                return None
+            keys = list(entries)
+            vectors = np.stack(list(entries.values()))
+        
+        similarities = vectors @ embedding
+        best = int(similarities.argmax())
+        if similarities[best] < self.similarity_threshold:
+            return None
+        
+        return self._get_cached_response(keys[best])
+    
+    def _store_response(self, key: Tuple, result: Dict[str, Any], embedding: Optional[np.ndarray]):
+        """Cache a generated reply, evicting the least recently used one"""
+        if self.cache_size <= 0:
+            return
+        
+        with self._cache_lock:
+            self._response_cache[key] = result
+            self._response_cache.move_to_end(key)
+            if embedding is not None:
+                self._semantic_index.setdefault(key[:2], {})[key] = embedding
+            
+            while len(self._response_cache) > self.cache_size:
+                evicted, _ = self._response_cache.popitem(last=False)
+                position = self._semantic_index.get(evicted[:2])
+                if position is not None:
+                    position.pop(evicted, None)
+                    if not position:
+                        del self._semantic_index[evicted[:2]]
+    
+    def generate_response_batch(self, turns: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Generate responses for several independent turns concurrently
+        
+        Args:
+            turns: generate_response keyword arguments, one dict per turn
+            
+        Returns:
+            Results in the same order as turns
+        """
+        if len(turns) <= 1:
+            return [self.generate_response(**turn) for turn in turns]
+        
+        # Turns the response cache treats as the same (script persona, flow
+        # context and normalized input) are generated once: concurrent
+        # duplicates would all miss the cache while the first is in flight
+        keys = [
+            self._cache_key(
+                FlowContext.coerce(turn['flow_context']),
+                turn['user_input'],
+                turn['script_metadata']
+            )
+            for turn in turns
+        ]
+        if self.cache_size > 0:
+            first_turn = {}
+            for index, key in enumerate(keys):
+                first_turn.setdefault(key, index)
+            distinct = list(first_turn.values())
+        else:
+            distinct = list(range(len(turns)))
+        
+        # Embed every input that may reach the model in one request, so the
+        # per-turn semantic cache lookups below find them ready
+        if self.embed_model:
+            self._embed_batch([
+                keys[index][2] for index in distinct
+                if not self._is_scripted_line(keys[index][1].agent_line)
+            ])
+        
+        # The client is thread-safe; the server interleaves decoding across
+        # its OLLAMA_NUM_PARALLEL slots
+        with ThreadPoolExecutor(max_workers=min(len(distinct), self.num_parallel)) as pool:
+            results = dict(zip(
+                distinct,
+                pool.map(lambda index: self.generate_response(**turns[index]), distinct)
+            ))
+        
+        if len(distinct) == len(turns):
+            return [results[index] for index in range(len(turns))]
+        
+        # Each duplicate gets its own copy of the shared result
+        return [
+            results[index] if index in results else dict(results[first_turn[key]])
+            for index, key in enumerate(keys)
+        ]
     
     def _clean_and_prepare_script_line(self, script_line: str, metadata: Dict) -> str:
         """
         Clean script line and prepare it for delivery.
         Removes quotes, cleans formatting, ensures proper punctuation.
         """
-        if not script_line:
-            return ""
-        
-        # Remove surrounding quotes
-        if script_line.startswith('"') and script_line.endswith('"'):
-            script_line = script_line[1:-1]
-        
-        # Remove agent name prefixes if present
-        prefixes = ["Agent:", "Agent (Clare):", "Clare:", "Assistant:", "Agent (", "Response:"]
-        for prefix in prefixes:
-            if script_line.startswith(prefix):
-                script_line = script_line[len(prefix):].strip()
-                # Also remove closing parenthesis if it was "Agent (Clare):"
-                if script_line.startswith(")"):
-                    script_line = script_line[1:].strip()
-        
-        # Remove extra quotes that might be inside
-        script_line = script_line.replace('""', '"')
-        
-        # Clean up whitespace
-        script_line = ' '.join(script_line.split())
-        
-        # Ensure ends with punctuation if it doesn't already
-        if script_line and script_line[-1] not in '.!?':
-            # Check if it's a question
-            question_starters = ['who', 'what', 'when', 'where', 'why', 'how', 'is', 'are', 
-                               'can', 'could', 'would', 'do', 'does', 'may', 'might']
-            if any(script_line.lower().startswith(q) for q in question_starters):
-                script_line += '?'
-            else:
-                script_line += '.'
-        
-        return script_line.strip()
+        # Cleaning depends on the line alone, so it is memoized per line
+        return _clean_script_line(script_line)
     
     def _clean_response(self, response: str) -> str:
         """Clean up AI response artifacts"""
         if not response:
             return ""
         
-        # Remove markdown
-        response = response.replace('**', '').replace('*', '')
+        # Remove markdown (dropping every '*' also covers '**')
+        response = response.replace('*', '')
         
-        # Remove common prefixes
-        prefixes = ["Agent: ", "Assistant: ", "Response: ", "Clare: ", "Agent (Clare): ", "Agent (Clare):", "Agent:"]
-        for prefix in prefixes:
-            if response.startswith(prefix):
-                response = response[len(prefix):].strip()
+        # Remove common prefixes (the text is stripped once one is found)
+        if response.startswith(_RESPONSE_PREFIXES):
+            response = response[_RESPONSE_PREFIX_RE.match(response).end():].rstrip()
         
         # Remove quotes if wrapping entire response
         if response.startswith('"') and response.endswith('"'):
@@ -228,100 +641,75 @@ class OllamaEngine:
         response = ' '.join(response.split())
         
         # Ensure ends with punctuation
-        if response and response[-1] not in '.!?':
-            question_starters = ['who', 'what', 'when', 'where', 'why', 'how', 'is', 'are', 
-                               'can', 'could', 'would', 'do', 'does', 'may', 'might']
-            if any(response.lower().startswith(q) for q in question_starters):
-                response += '?'
-            else:
-                response += '.'
-        
-        return response.strip()
+        return _ensure_terminal_punctuation(response)
     
-    def _get_flow_aware_system_prompt(self, metadata: Dict, flow_context: Dict) -> str:
-        """Create system prompt with flow awareness"""
-        
+    def _get_flow_aware_system_prompt(self, metadata: Dict) -> str:
+        """
+        Create the system prompt that stays the same for a whole script.
+        Per-turn details go in a separate message (_get_flow_context_message)
+        so this prefix is identical across turns and the server can reuse
+        its KV cache for it.
+        """
+        return _build_system_prompt(*self._script_persona(metadata))
+    
+    @staticmethod
+    def _script_persona(metadata: Dict) -> Tuple[str, str, str]:
+        """(agent_name, tone, call_type) of a script, as used in its system prompt"""
         agent_name = metadata.get('agent_name', metadata.get('agent name', 'the agent'))
         tone = metadata.get('tone', metadata.get('style', 'professional and friendly'))
         call_type = metadata.get('call_type', 'outbound').lower()
         
-        current_section = flow_context.get('section', 'unknown')
-        current_phase = flow_context.get('phase', 'conversation')
-        exact_line = flow_context.get('agent_line', '')
-        
-        return f"""You are {agent_name}, a professional call center agent following a precise script.
-
-🎯 CRITICAL INSTRUCTIONS:
-1. You MUST say EXACTLY what's in the script below
-2. Use the COMPLETE script line provided - do not shorten or split it
-3. Do NOT add extra information not in the script
-4. Do NOT skip any part of the script
-5. Only make tiny adjustments for natural flow (like "Great!" before the script)
-
-CURRENT CONTEXT:
-- Section: {current_section}
-- Phase: {current_phase}
-- Call Type: {call_type.upper()}
-- Tone: {tone}
-
-YOUR EXACT SCRIPT LINE (USE COMPLETE LINE):
-"{exact_line}"
-
-WHAT TO DO:
-- Say the complete line above word-for-word
-- Keep it natural and conversational
-- Follow the script precisely
-- Do not split this into multiple parts
-- Say it all in one response
-
-Remember: Script compliance is critical. Say the COMPLETE line."""
+        return agent_name, tone, call_type
+    
+    def _get_flow_context_message(self, flow_context: FlowContext) -> str:
+        """Create the per-turn system message: where we are and what to say"""
+        return (
+            "CURRENT CONTEXT:\n"
+            f"- Section: {flow_context.section}\n"
+            f"- Phase: {flow_context.phase}\n"
+            "\n"
+            "YOUR EXACT SCRIPT LINE (USE COMPLETE LINE):\n"
+            f'"{flow_context.agent_line}"'
+        )
     
     def _build_flow_aware_prompt(
         self,
         user_input: str,
         intent_data: Dict,
-        flow_context: Dict,
+        flow_context: FlowContext,
         conversation_history: List[Dict],
         script_metadata: Dict
     ) -> str:
         """Build prompt with flow context"""
         
-        parts = []
-        
         # Get exact line
-        exact_line = flow_context.get('agent_line', '')
-        
-        # Flow context
-        parts.append("=== CURRENT SITUATION ===")
-        parts.append(f"Section: {flow_context.get('section', 'unknown')}")
-        parts.append(f"Phase: {flow_context.get('phase', 'conversation')}")
-        parts.append("")
+        exact_line = flow_context.agent_line
         
         # Recent conversation (last 3 exchanges)
+        history = ''
         if len(conversation_history) > 1:
-            parts.append("=== RECENT CONVERSATION ===")
-            for msg in conversation_history[-6:]:
-                role = "Agent" if msg['role'] == 'assistant' else "Customer"
-                parts.append(f"{role}: {msg['content']}")
-            parts.append("")
-        
-        # User's current input
-        parts.append("=== CUSTOMER JUST SAID ===")
-        parts.append(f'"{user_input}"')
-        parts.append("")
+            history = "=== RECENT CONVERSATION ===\n" + "\n".join(
+                f"{_ROLE_LABELS.get(msg['role'], 'Customer')}: {msg['content']}"
+                for msg in conversation_history[-6:]
+            ) + "\n\n"
         
         # Exact script line (MOST IMPORTANT)
         if exact_line:
-            parts.append("=== YOUR COMPLETE RESPONSE (SAY THIS EXACTLY) ===")
-            parts.append(f'"{exact_line}"')
-            parts.append("")
-            parts.append("🎯 Use the COMPLETE line above as your response.")
-            parts.append("   Do not shorten it. Do not split it. Say it all.")
+            instruction = _EXACT_LINE_INSTRUCTION.format(exact_line=exact_line)
         else:
-            parts.append("=== YOUR RESPONSE ===")
-            parts.append("Respond briefly and naturally to continue the conversation.")
+            instruction = _FREE_RESPONSE_INSTRUCTION
         
-        return "\n".join(parts)
+        return (
+            "=== CURRENT SITUATION ===\n"
+            f"Section: {flow_context.section}\n"
+            f"Phase: {flow_context.phase}\n"
+            "\n"
+            f"{history}"
+            "=== CUSTOMER JUST SAID ===\n"
+            f'"{user_input}"\n'
+            "\n"
+            f"{instruction}"
+        )
     
     def generate_response_legacy(
         self,
@@ -3,20 +3,144 @@ Script Flow Engine - Maintains conversation state and follows script precisely
 """
 
 import re
-from typing import Dict, List, Optional, Any
+from functools import lru_cache
+from itertools import chain
+from types import MappingProxyType
+from typing import Dict, List, Optional, Any, Tuple, Union
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Patterns used on every flow step, compiled once
+_VARIABLE_RE = re.compile(r'\{\{(\w+)\}\}')
+_EMAIL_RE = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b')
+# 10-11 digit phone numbers, optionally grouped with spaces, dots or dashes
+_PHONE_RE = re.compile(r'(?<!\w)\d(?:[ .\-]?\d){9,10}(?!\w)')
+_NON_DIGIT_RE = re.compile(r'\D')
 
-class ScriptFlowEngine:
+# Section-name keywords per section type, in priority order
+_SECTION_TYPE_KEYWORDS = (
+    ('OPENING', ('start', 'greeting', 'opening')),
+    ('INTRODUCTION', ('introduction', 'intro')),
+    ('DATA_COLLECTION', ('personal details', 'contact', 'name', 'title')),
+    ('PROPERTY_INFO', ('property', 'address')),
+    ('BOOKING', ('booking', 'appointment', 'confirm')),
+    ('OBJECTION_HANDLING', ('objection', 'if user', 'handle')),
+    ('CLOSING', ('end', 'goodbye', 'closing')),
+)
+
+# Each branch is an anchored lookahead over the whole name, so the first
+# type in priority order wins no matter where its keyword appears
+_SECTION_TYPE_RE = re.compile(
+    '^(?:' + '|'.join(
+        f"(?=.*(?:{'|'.join(map(re.escape, keywords))}))(?P<{section_type}>)"
+        for section_type, keywords in _SECTION_TYPE_KEYWORDS
+    ) + ')',
+    re.DOTALL
+)
+
+# Confirmation words, matched as whole words so 'look' or 'eyes' don't count.
+# The sets also list the stretched and run-together spellings people type
+# ("yess", "okey", "alright"); letter runs are first cut to two, so "yesss"
+# and "okkk" are looked up as "yess" and "okk".
+_WORD_RE = re.compile(r"\w+")
+_LETTER_RUN_RE = re.compile(r"(\w)\1{2,}")
+_YES_WORDS = frozenset({'yes', 'yess', 'yessir', 'yeah', 'yeahh', 'sure', 'surely'})
+_OK_WORDS = frozenset({'ok', 'okk', 'okay', 'okayy', 'okey', 'oki', 'okie'})
+_CONFIRM_WORDS = _YES_WORDS | _OK_WORDS | {'yep', 'yepp', 'yea'}
+_OPENING_CONFIRM_WORDS = _CONFIRM_WORDS | {'speaking'}
+_OPENING_CONFIRM_RE = re.compile(r"\bthis is\b")
+_INTRODUCTION_AGREE_WORDS = _CONFIRM_WORDS | {
+    'right', 'righto', 'alright', 'allright', 'alrighty',
+    'correct', 'fine', 'good', 'absolutely', 'definitely'
+}
+_INTRODUCTION_AGREE_RE = re.compile(r"\bgo ahead\b")
+_BOOKING_AGREE_WORDS = _YES_WORDS | _OK_WORDS | {'fine', 'good'}
+
+# Common objection patterns, in priority order
+_OBJECTION_KEYWORDS = {
+    'not_good_time': ['not a good time', 'busy', 'call back', 'later', 'not now'],
+    'not_interested': ['not interested', "don't want", 'no thanks', 'not for me'],
+    'too_long': ['how long', 'too long', 'quick', 'time'],
+    'bad_reviews': ['review', 'scam', 'trust', 'legitimate'],
+    'thought_instant': ['instant', 'immediate', 'now', 'straight away']
+}
+
+
+def _build_objection_scanner():
     """
-    Manages conversation flow according to script structure.
-    Ensures AI follows the script precisely and in the correct order.
+    Build one regex that reports every objection keyword in a single pass.
+
+    The alternation sits in a lookahead so overlapping keywords are all
+    found, longest first at each position. A keyword that contains shorter
+    keywords (e.g. 'not now' contains 'now') maps to all of their types.
+    """
+    keywords = {kw for kws in _OBJECTION_KEYWORDS.values() for kw in kws}
+    types_by_keyword = {
+        kw: frozenset(
+            obj_type for obj_type, kws in _OBJECTION_KEYWORDS.items()
+            if any(other in kw for other in kws)
+        )
+        for kw in keywords
+    }
+    alternation = '|'.join(re.escape(kw) for kw in sorted(keywords, key=len, reverse=True))
+    return re.compile(f'(?=({alternation}))'), types_by_keyword
+
+
+_OBJECTION_RE, _OBJECTION_TYPES_BY_KEYWORD = _build_objection_scanner()
+
+
+def _objection_types_in(text: str) -> frozenset:
+    """Objection types with at least one keyword in lowercased text"""
+    found = set()
+    for match in _OBJECTION_RE.finditer(text):
+        found |= _OBJECTION_TYPES_BY_KEYWORD[match.group(1)]
+    return frozenset(found)
+
+
+# Completion labels the opening and introduction handlers record when the
+# caller confirms / agrees (a section with the same name shares its bit)
+_OPENING_DONE = 'OPENING'
+_INTRODUCTION_DONE = 'INTRODUCTION'
+
+# Confirmation labels reported by _scan_user_input next to objection types
+_CONFIRMS_OPENING = 'confirms_opening'
+_AGREES_INTRODUCTION = 'agrees_introduction'
+_AGREES_BOOKING = 'agrees_booking'
+
+
+@lru_cache(maxsize=1024)
+def _scan_user_input(user_lower: str) -> frozenset:
+    """
+    Everything the flow reacts to in lowercased user input, scanned once.
+
+    Returns the objection types mentioned plus a confirmation label for each
+    handler whose agreement words appear. Short replies ("yes", "ok") repeat
+    across turns and calls, so results are memoized.
+    """
+    labels = set(_objection_types_in(user_lower))
+    words = _WORD_RE.findall(_LETTER_RUN_RE.sub(r'\1\1', user_lower))
+    
+    if not _OPENING_CONFIRM_WORDS.isdisjoint(words) or _OPENING_CONFIRM_RE.search(user_lower):
+        labels.add(_CONFIRMS_OPENING)
+    if not _INTRODUCTION_AGREE_WORDS.isdisjoint(words) or _INTRODUCTION_AGREE_RE.search(user_lower):
+        labels.add(_AGREES_INTRODUCTION)
+    if not _BOOKING_AGREE_WORDS.isdisjoint(words):
+        labels.add(_AGREES_BOOKING)
+    
+    return frozenset(labels)
+
+
+class CompiledScript:
+    """
+    Read-only flow tables for a parsed script.
+    
+    Built once per script and shared by every ScriptFlowEngine (one per
+    call) running it; engines only hold their own conversation state.
     """
     
     def __init__(self, parsed_script: Dict[str, Any]):
-        """Initialize with parsed script"""
+        """Build flow tables from parsed script"""
         self.script = parsed_script
         self.sections = parsed_script.get('sections', [])
         self.metadata = parsed_script.get('metadata', {})
@@ -24,13 +148,57 @@ class ScriptFlowEngine:
         # Build flow map
         self.flow_map = self._build_flow_map()
         
-        # Initialize state
-        self.current_section = None
-        self.completed_sections = set()
-        self.collected_data = {}
-        self.conversation_phase = "START"
+        # Flat per-position views of the flow map for sequential traversal
+        self.section_names = [
+            section.get('name', f'SECTION_{i}') for i, section in enumerate(self.sections)
+        ]
+        self.section_types = [self.flow_map[name]['type'] for name in self.section_names]
+        self.section_index = {name: data['index'] for name, data in self.flow_map.items()}
+        self.section_bits = [1 << self.section_index[name] for name in self.section_names]
+        
+        # Completion bit per section name, plus a spare bit above the sections
+        # for each handler label that isn't also a section name
+        self.completion_bits = {name: 1 << index for name, index in self.section_index.items()}
+        spare_bit = len(self.sections)
+        for label in (_OPENING_DONE, _INTRODUCTION_DONE):
+            if label not in self.completion_bits:
+                self.completion_bits[label] = 1 << spare_bit
+                spare_bit += 1
+        
+        # Section names of each type, in script order
+        self.sections_by_type = {}
+        for section_name, section_data in self.flow_map.items():
+            self.sections_by_type.setdefault(section_data['type'], []).append(section_name)
         
-        logger.info(f"Script Flow Engine initialized with {len(self.sections)} sections")
+        # Step returned when moving into each section, built once. Shared by
+        # every session on the script, so it is read-only (engines hand out
+        # copies, see ScriptFlowEngine._section_step)
+        self.section_steps = {
+            section_name: MappingProxyType({
+                'section': section_name,
+                'type': section_data['type'],
+                'agent_line': section_data['dialogue'],
+                'required_fields': tuple(section_data['required_fields']),
+                'phase': section_data['type']
+            })
+            for section_name, section_data in self.flow_map.items()
+        }
+        
+        # Progress counts every section a call moves through, not objections
+        self.total_sections = sum(
+            1 for section_data in self.flow_map.values()
+            if section_data['type'] != 'OBJECTION_HANDLING'
+        )
+        
+        openings = self.sections_by_type.get('OPENING')
+        self.opening_section = openings[0] if openings else None
+        
+        # Objection sections with the objection types their names mention
+        self.objection_sections = [
+            (section_name, _objection_types_in(section_name.lower()))
+            for section_name, section_data in self.flow_map.items()
+            if section_data['type'] == 'OBJECTION_HANDLING'
+        ]
     
     def _build_flow_map(self) -> Dict[str, Dict]:
         """
@@ -63,42 +231,63 @@ class ScriptFlowEngine:
     
     def _classify_section(self, name: str, section: Dict) -> str:
         """Classify section type based on name and content"""
-        name_lower = name.lower()
-        
-        if 'start' in name_lower or 'greeting' in name_lower or 'opening' in name_lower:
-            return 'OPENING'
-        elif 'introduction' in name_lower or 'intro' in name_lower:
-            return 'INTRODUCTION'
-        elif 'personal details' in name_lower or 'contact' in name_lower or 'name' in name_lower or 'title' in name_lower:
-            return 'DATA_COLLECTION'
-        elif 'property' in name_lower or 'address' in name_lower:
-            return 'PROPERTY_INFO'
-        elif 'booking' in name_lower or 'appointment' in name_lower or 'confirm' in name_lower:
-            return 'BOOKING'
-        elif 'objection' in name_lower or 'if user' in name_lower or 'handle' in name_lower:
-            return 'OBJECTION_HANDLING'
-        elif 'end' in name_lower or 'goodbye' in name_lower or 'closing' in name_lower:
-            return 'CLOSING'
-        else:
-            return 'CONVERSATION'
+        match = _SECTION_TYPE_RE.match(name.lower())
+        return match.lastgroup if match else 'CONVERSATION'
     
     def _extract_required_fields(self, section: Dict) -> List[str]:
         """Extract variable names that need to be collected"""
         dialogue = section.get('dialogue', '')
-        variables = section.get('variables', set())
+        variables = section.get('variables') or ()
         
         # Find {{variable}} patterns
-        pattern = r'\{\{(\w+)\}\}'
-        matches = re.findall(pattern, dialogue)
+        matches = _VARIABLE_RE.findall(dialogue)
         
-        # Combine with explicit variables
-        return list(set(matches) | variables)
+        # Combine with explicit variables: dialogue order first, then sorted
+        # so the first field (used as the raw-input fallback) is stable
+        return list(dict.fromkeys(chain(matches, sorted(variables))))
     
     def _determine_next_section(self, current_index: int) -> Optional[str]:
         """Determine the next section in sequence"""
         if current_index + 1 < len(self.sections):
             return self.sections[current_index + 1].get('name')
         return None
+
+
+class ScriptFlowEngine:
+    """
+    Manages conversation flow according to script structure.
+    Ensures AI follows the script precisely and in the correct order.
+    """
+    
+    def __init__(self, script: Union[CompiledScript, Dict[str, Any]]):
+        """Initialize with a compiled script (shared) or a parsed script"""
+        if not isinstance(script, CompiledScript):
+            script = CompiledScript(script)
+        self._c = script
+        
+        # Read-only script data, shared with other engines on the same script
+        self.script = script.script
+        self.sections = script.sections
+        self.metadata = script.metadata
+        self.flow_map = script.flow_map
+        
+        # Handler per section type; anything else is general conversation
+        self._handlers = {
+            'OPENING': self._handle_opening,
+            'INTRODUCTION': self._handle_introduction,
+            'DATA_COLLECTION': self._handle_data_collection,
+            'PROPERTY_INFO': self._handle_property_info,
+            'BOOKING': self._handle_booking,
+        }
+        
+        # Initialize state
+        self.current_section = None
+        self._completed_mask = 0  # bit i set once the section at index i is done
+        self.collected_data = {}
+        self.conversation_phase = "START"
+        self._type_cursor = {}
+        
+        logger.info(f"Script Flow Engine initialized with {len(self.sections)} sections")
     
     def start_conversation(self) -> Dict[str, Any]:
         """
@@ -107,19 +296,13 @@ class ScriptFlowEngine:
         Returns:
             Dict with section info and agent's opening line
         """
-        # Find the CALL START or first section
-        for section_name, section_data in self.flow_map.items():
-            if section_data['type'] == 'OPENING':
-                self.current_section = section_name
-                self.conversation_phase = 'OPENING'
-                
-                return {
-                    'section': section_name,
-                    'type': 'OPENING',
-                    'agent_line': section_data['dialogue'],
-                    'required_fields': section_data['required_fields'],
-                    'phase': self.conversation_phase
-                }
+        # Use the CALL START section found at init, or the first section
+        section_name = self._c.opening_section
+        if section_name is not None:
+            self.current_section = section_name
+            self.conversation_phase = 'OPENING'
+            
+            return self._section_step(section_name)
         
         # Fallback: use first section
         if self.sections:
@@ -166,8 +349,11 @@ class ScriptFlowEngine:
             logger.error(f"Current section '{self.current_section}' not found in flow map")
             return self._fallback_response()
         
+        # Scan once for objections and confirmations
+        labels = _scan_user_input(user_input.lower())
+        
         # Check for objections first
-        objection_response = self._check_for_objections(user_input, intent_data)
+        objection_response = self._check_for_objections(labels, intent_data)
         if objection_response:
             return objection_response
         
@@ -176,73 +362,64 @@ class ScriptFlowEngine:
         sentiment = intent_data.get('sentiment', 'neutral')
         
         # Handle based on section type and user response
-        if current['type'] == 'OPENING':
-            return self._handle_opening(user_input, intent_data)
-        elif current['type'] == 'INTRODUCTION':
-            return self._handle_introduction(user_input, intent_data)
-        elif current['type'] == 'DATA_COLLECTION':
-            return self._handle_data_collection(user_input, intent_data)
-        elif current['type'] == 'PROPERTY_INFO':
-            return self._handle_property_info(user_input, intent_data)
-        elif current['type'] == 'BOOKING':
-            return self._handle_booking(user_input, intent_data)
-        else:
-            return self._handle_general_conversation(user_input, intent_data)
+        handler = self._handlers.get(current['type'], self._handle_general_conversation)
+        return handler(user_input, labels, intent_data)
+    
+    @staticmethod
+    def get_next_step_batch(
+        turns: List[Tuple['ScriptFlowEngine', str, Dict]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Advance several conversations (or replay one) in a single call.
+        Same as calling get_next_step per turn: engines share the compiled
+        script and the memoized input scan, so repeated inputs are scanned once.
+        
+        Args:
+            turns: (engine, user_input, intent_data) per turn; turns for the
+                same engine are applied in order, as get_next_step would
+            
+        Returns:
+            Next steps in the same order as turns
+        """
+        return [
+            engine.get_next_step(user_input, intent_data)
+            for engine, user_input, intent_data in turns
+        ]
     
-    def _check_for_objections(self, user_input: str, intent_data: Dict) -> Optional[Dict]:
+    def _check_for_objections(self, labels: frozenset, intent_data: Dict) -> Optional[Dict]:
         """Check if user is objecting and return appropriate response"""
-        user_lower = user_input.lower()
-        
-        # Common objection patterns
-        objections = {
-            'not_good_time': ['not a good time', 'busy', 'call back', 'later', 'not now'],
-            'not_interested': ['not interested', "don't want", 'no thanks', 'not for me'],
-            'too_long': ['how long', 'too long', 'quick', 'time'],
-            'bad_reviews': ['review', 'scam', 'trust', 'legitimate'],
-            'thought_instant': ['instant', 'immediate', 'now', 'straight away']
-        }
+        # Nothing to route to, or nothing objected to
+        if not self._c.objection_sections or labels.isdisjoint(_OBJECTION_KEYWORDS):
+            return None
         
         # Find matching objection sections
-        for section_name, section_data in self.flow_map.items():
-            if section_data['type'] == 'OBJECTION_HANDLING':
-                section_lower = section_name.lower()
-                
-                # Check if this objection matches
-                for obj_type, keywords in objections.items():
-                    if any(keyword in user_lower for keyword in keywords):
-                        if any(keyword in section_lower for keyword in keywords):
-                            return {
-                                'section': section_name,
-                                'type': 'OBJECTION_HANDLING',
-                                'agent_line': section_data['dialogue'],
-                                'required_fields': [],
-                                'phase': 'OBJECTION',
-                                'objection_type': obj_type
-                            }
+        for section_name, section_types in self._c.objection_sections:
+            # Check if this objection matches
+            for obj_type in _OBJECTION_KEYWORDS:
+                if obj_type in labels and obj_type in section_types:
+                    return {
+                        'section': section_name,
+                        'type': 'OBJECTION_HANDLING',
+                        'agent_line': self.flow_map[section_name]['dialogue'],
+                        'required_fields': [],
+                        'phase': 'OBJECTION',
+                        'objection_type': obj_type
+                    }
         
         return None
     
-    def _handle_opening(self, user_input: str, intent_data: Dict) -> Dict[str, Any]:
+    def _handle_opening(self, user_input: str, labels: frozenset, intent_data: Dict) -> Dict[str, Any]:
         """Handle opening section"""
-        user_lower = user_input.lower()
-        
         # Check if user confirmed they are the right person
-        if any(word in user_lower for word in ['yes', 'yeah', 'speaking', 'this is', 'yep', 'yea', 'sure', 'ok', 'okay']):
+        if _CONFIRMS_OPENING in labels:
             # Move to introduction
             next_section = self._get_next_section_by_type('INTRODUCTION')
             if next_section:
                 self.current_section = next_section
-                self.completed_sections.add('OPENING')
+                self._mark_completed(_OPENING_DONE)
                 self.conversation_phase = 'INTRODUCTION'
                 
-                section_data = self.flow_map[next_section]
-                return {
-                    'section': next_section,
-                    'type': 'INTRODUCTION',
-                    'agent_line': section_data['dialogue'],
-                    'required_fields': section_data['required_fields'],
-                    'phase': 'INTRODUCTION'
-                }
+                return self._section_step(next_section)
         
         # User didn't confirm - ask again or clarify
         return {
@@ -253,31 +430,20 @@ class ScriptFlowEngine:
             'phase': 'OPENING'
         }
     
-    def _handle_introduction(self, user_input: str, intent_data: Dict) -> Dict[str, Any]:
+    def _handle_introduction(self, user_input: str, labels: frozenset, intent_data: Dict) -> Dict[str, Any]:
         """Handle introduction section"""
-        user_lower = user_input.lower()
-        
         # Check if user agrees to continue (comprehensive positive responses)
-        positive_responses = ['yes', 'yeah', 'ok', 'okay', 'sure', 'go ahead', 'right', 'correct', 
-                            "that's right", 'yep', 'yea', 'fine', 'good', 'absolutely', 'definitely']
-        
-        if any(word in user_lower for word in positive_responses):
+        if _AGREES_INTRODUCTION in labels:
             # Move to next section (usually data collection)
             next_section = self._find_next_sequential_section()
             if next_section:
                 self.current_section = next_section
-                self.completed_sections.add('INTRODUCTION')
+                self._mark_completed(_INTRODUCTION_DONE)
                 
-                section_data = self.flow_map[next_section]
-                self.conversation_phase = section_data['type']
+                step = self._section_step(next_section)
+                self.conversation_phase = step['phase']
                 
-                return {
-                    'section': next_section,
-                    'type': section_data['type'],
-                    'agent_line': section_data['dialogue'],
-                    'required_fields': section_data['required_fields'],
-                    'phase': self.conversation_phase
-                }
+                return step
         
         # User has questions or concerns
         return {
@@ -288,59 +454,48 @@ class ScriptFlowEngine:
             'phase': 'INTRODUCTION'
         }
     
-    def _handle_data_collection(self, user_input: str, intent_data: Dict) -> Dict[str, Any]:
+    def _handle_data_collection(self, user_input: str, labels: frozenset, intent_data: Dict) -> Dict[str, Any]:
         """Handle data collection sections"""
         current = self.flow_map[self.current_section]
         required_fields = current['required_fields']
         
-        # Try to extract data from user input
-        extracted_data = self._extract_data_from_input(user_input, required_fields)
+        stripped = user_input.strip()
+        
+        # Try to extract data from user input. Two characters or fewer can't
+        # hold an email or phone number, so skip the patterns and keep the
+        # raw reply the way the extractor's fallback would
+        if len(stripped) > 2:
+            extracted_data = self._extract_data_from_input(user_input, required_fields)
+        else:
+            extracted_data = {required_fields[0]: user_input} if required_fields else {}
         self.collected_data.update(extracted_data)
         
         # If user provides data or confirms, move forward
-        user_lower = user_input.lower()
-        
-        if user_input.strip() and len(user_input.strip()) > 2:
+        if len(stripped) > 2:
             # Move to next section
             next_section = self._find_next_sequential_section()
             if next_section:
+                self._mark_completed(current['name'])
                 self.current_section = next_section
-                self.completed_sections.add(current['name'])
                 
-                section_data = self.flow_map[next_section]
-                return {
-                    'section': next_section,
-                    'type': section_data['type'],
-                    'agent_line': section_data['dialogue'],
-                    'required_fields': section_data['required_fields'],
-                    'phase': section_data['type']
-                }
+                return self._section_step(next_section)
         
         # Fallback
         return self._continue_to_next_section()
     
-    def _handle_property_info(self, user_input: str, intent_data: Dict) -> Dict[str, Any]:
+    def _handle_property_info(self, user_input: str, labels: frozenset, intent_data: Dict) -> Dict[str, Any]:
         """Handle property information collection"""
-        return self._handle_data_collection(user_input, intent_data)
+        return self._handle_data_collection(user_input, labels, intent_data)
     
-    def _handle_booking(self, user_input: str, intent_data: Dict) -> Dict[str, Any]:
+    def _handle_booking(self, user_input: str, labels: frozenset, intent_data: Dict) -> Dict[str, Any]:
         """Handle booking section"""
-        user_lower = user_input.lower()
-        
         # Check if user agrees to booking
-        if any(word in user_lower for word in ['yes', 'ok', 'okay', 'sure', 'fine', 'good', 'yeah']):
+        if _AGREES_BOOKING in labels:
             next_section = self._find_next_sequential_section()
             if next_section:
                 self.current_section = next_section
-                section_data = self.flow_map[next_section]
                 
-                return {
-                    'section': next_section,
-                    'type': section_data['type'],
-                    'agent_line': section_data['dialogue'],
-                    'required_fields': section_data['required_fields'],
-                    'phase': 'BOOKING'
-                }
+                return self._section_step(next_section, phase='BOOKING')
         
         return {
             'section': self.current_section,
@@ -350,7 +505,7 @@ class ScriptFlowEngine:
             'phase': 'BOOKING'
         }
     
-    def _handle_general_conversation(self, user_input: str, intent_data: Dict) -> Dict[str, Any]:
+    def _handle_general_conversation(self, user_input: str, labels: frozenset, intent_data: Dict) -> Dict[str, Any]:
         """Handle general conversation - move to next section"""
         return self._continue_to_next_section()
     
@@ -358,17 +513,10 @@ class ScriptFlowEngine:
         """Move to next section in sequence"""
         next_section = self._find_next_sequential_section()
         if next_section:
-            self.completed_sections.add(self.current_section)
+            self._mark_completed(self.current_section)
             self.current_section = next_section
             
-            section_data = self.flow_map[next_section]
-            return {
-                'section': next_section,
-                'type': section_data['type'],
-                'agent_line': section_data['dialogue'],
-                'required_fields': section_data['required_fields'],
-                'phase': section_data['type']
-            }
+            return self._section_step(next_section)
         
         # No more sections - end call
         return {
@@ -379,36 +527,58 @@ class ScriptFlowEngine:
             'phase': 'CLOSING'
         }
     
+    def _section_step(self, section_name: str, phase: Optional[str] = None) -> Dict[str, Any]:
+        """Step dict for moving into a section (the caller's own copy)"""
+        step = self._c.section_steps[section_name]
+        return {
+            **step,
+            'required_fields': list(step['required_fields']),
+            'phase': step['phase'] if phase is None else phase
+        }
+    
     def _find_next_sequential_section(self) -> Optional[str]:
         """Find next section in sequence that hasn't been completed"""
-        if not self.current_section:
-            return None
-        
-        current = self.flow_map.get(self.current_section)
-        if not current:
+        current_index = self._c.section_index.get(self.current_section)
+        if current_index is None:
             return None
         
-        current_index = current['index']
+        names = self._c.section_names
+        types = self._c.section_types
+        bits = self._c.section_bits
+        mask = self._completed_mask
         
-        # Find next section that's not completed
-        for i in range(current_index + 1, len(self.sections)):
-            section = self.sections[i]
-            section_name = section.get('name', f'SECTION_{i}')
-            
-            if section_name not in self.completed_sections:
-                # Skip objection handling sections
-                section_data = self.flow_map.get(section_name)
-                if section_data and section_data['type'] != 'OBJECTION_HANDLING':
-                    return section_name
+        # Find next section that's not completed, skipping objection handling
+        for i in range(current_index + 1, len(names)):
+            if types[i] != 'OBJECTION_HANDLING' and not mask & bits[i]:
+                return names[i]
         
         return None
     
     def _get_next_section_by_type(self, section_type: str) -> Optional[str]:
         """Find next section of specific type"""
-        for section_name, section_data in self.flow_map.items():
-            if section_data['type'] == section_type and section_name not in self.completed_sections:
-                return section_name
-        return None
+        candidates = self._c.sections_by_type.get(section_type, ())
+        
+        # Sections only ever get completed, so skipped ones stay skipped
+        cursor = self._type_cursor.get(section_type, 0)
+        while cursor < len(candidates) and self._is_completed(candidates[cursor]):
+            cursor += 1
+        self._type_cursor[section_type] = cursor
+        
+        return candidates[cursor] if cursor < len(candidates) else None
+    
+    def _mark_completed(self, section_name: str):
+        """Set the completion bit of a section (or handler label)"""
+        self._completed_mask |= self._c.completion_bits.get(section_name, 0)
+    
+    def _is_completed(self, section_name: str) -> bool:
+        """Check the completion bit of a section"""
+        return bool(self._completed_mask & self._c.completion_bits[section_name])
+    
+    @property
+    def completed_sections(self) -> List[str]:
+        """Completed section names in script order, then handler labels"""
+        mask = self._completed_mask
+        return [name for name, bit in self._c.completion_bits.items() if mask & bit]
     
     def _extract_data_from_input(self, user_input: str, expected_fields: List[str]) -> Dict[str, str]:
         """Extract expected data from user input"""
@@ -416,16 +586,14 @@ class ScriptFlowEngine:
         
         # Simple extraction patterns
         if 'email' in expected_fields:
-            email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-            emails = re.findall(email_pattern, user_input)
+            emails = _EMAIL_RE.findall(user_input)
             if emails:
                 extracted['email'] = emails[0]
         
         if 'mobile' in expected_fields or 'phone' in expected_fields:
-            phone_pattern = r'\b\d{10,11}\b'
-            phones = re.findall(phone_pattern, user_input.replace(' ', ''))
-            if phones:
-                extracted['mobile'] = phones[0]
+            phone = _PHONE_RE.search(user_input)
+            if phone:
+                extracted['mobile'] = _NON_DIGIT_RE.sub('', phone.group())
         
         # For names, dates, etc., store the raw input
         if expected_fields and not extracted:
@@ -445,13 +613,13 @@ class ScriptFlowEngine:
     
     def get_progress(self) -> Dict[str, Any]:
         """Get conversation progress"""
-        total_sections = len([s for s in self.flow_map.values() if s['type'] != 'OBJECTION_HANDLING'])
-        completed = len(self.completed_sections)
+        total_sections = self._c.total_sections
+        completed = self._completed_mask.bit_count()
         
         return {
             'current_section': self.current_section,
             'phase': self.conversation_phase,
-            'completed_sections': list(self.completed_sections),
+            'completed_sections': self.completed_sections,
             'total_sections': total_sections,
             'progress_percentage': (completed / total_sections * 100) if total_sections > 0 else 0,
             'collected_data': self.collected_data
@@ -460,6 +628,7 @@ class ScriptFlowEngine:
     def reset(self):
         """Reset conversation state"""
         self.current_section = None
-        self.completed_sections = set()
+        self._completed_mask = 0
         self.collected_data = {}
-        self.conversation_phase = "START"
\ No newline at end of file
+        self.conversation_phase = "START"
+        self._type_cursor = {}
\ No newline at end of file
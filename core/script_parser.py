@@ -4,11 +4,71 @@ No hardcoding - adapts to any structure automatically
 """
 
 import re
+from dataclasses import dataclass
+from functools import cached_property
 from typing import Dict, List, Optional, Set, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Agent line formats
+_AGENT_COLON_RE = re.compile(r'^Agent\s*(\([^)]*\))?:', re.IGNORECASE)
+_NAME_COLON_RE = re.compile(r'^[A-Z][a-z]+:')
+_AGENT_NAME_COLON_RE = re.compile(r'^[A-Z][a-z]{2,15}:')
+_NAME_PARENS_RE = re.compile(r'^\([A-Z][a-z\s]+\):')
+_QUOTED_RE = re.compile(r'^"[^"]+"$')
+
+# First characters the header-exclusion / statement patterns can start with
+# (IGNORECASE also folds the Turkish dotted/dotless I onto 'i')
+_HEADER_EXCLUDE_FIRST_CHARS = frozenset('AaIiWwUuCc\u0130\u0131')
+_STATEMENT_FIRST_CHARS = frozenset('IiWwUu\u0130\u0131')
+
+# Lines that are never section headers / that start a new statement
+_HEADER_EXCLUDE_RE = re.compile(r'^(Agent|If|IF|When|WHEN|Unless|UNLESS|User|Customer)\s*[:(]', re.IGNORECASE)
+_STATEMENT_START_RE = re.compile(r'^(If |IF |When |WHEN |Unless )', re.IGNORECASE)
+
+# Line kinds computed once per script by _classify_lines
+_EMPTY, _HEADER, _AGENT, _CONTENT = range(4)
+
+_VARIABLE_RE = re.compile(r'\{\{([a-zA-Z_][a-zA-Z0-9_]*)\}\}')
+
+# Words that make a short line look like a section header. Matched as
+# substrings ("Callback" counts as "call"), so one alternation scan
+# replaces a search per keyword.
+_SECTION_KEYWORDS = (
+    'start', 'end', 'opening', 'closing', 'introduction', 'greeting',
+    'collection', 'details', 'information', 'booking', 'confirmation',
+    'objection', 'handling', 'qualification', 'verification', 'call'
+)
+_SECTION_KEYWORD_RE = re.compile('|'.join(map(re.escape, _SECTION_KEYWORDS)))
+
+# Section names that mark where the call opens (START/OPENING/GREETING...)
+_START_KEYWORD_RE = re.compile(r'start|open|greet|begin|hello')
+
+# Speaker prefixes removed from agent dialogue, in order: "Agent:" and
+# variants (any case), then a name like "Clare:", then one like "(Sarah):".
+# Each part is optional, so one match strips what three anchored subs did.
+_CLEAN_PREFIX_RE = re.compile(
+    r'^(?:(?i:Agent\s*(?:\([^)]*\))?:)\s*)?'
+    r'(?:[A-Z][a-z]+:\s*)?'
+    r'(?:\([A-Z][a-z\s]+\):\s*)?'
+)
+
+
+@dataclass(slots=True)
+class LineInfo:
+    """A script line with the string facts the detectors keep asking for"""
+    text: str           # stripped line
+    word_count: int
+    is_upper: bool
+    is_title: bool
+    
+    @classmethod
+    def from_line(cls, line: str) -> 'LineInfo':
+        """Strip and measure a raw line once"""
+        text = line.strip()
+        return cls(text, len(text.split()), text.isupper(), text.istitle())
+
 
 class UniversalScriptParser:
     """
@@ -20,6 +80,7 @@ class UniversalScriptParser:
     def __init__(self, script_text: str):
         self.raw_text = script_text
         self.lines = [line.rstrip() for line in script_text.split('\n')]
+        self._line_info = [LineInfo.from_line(line) for line in self.lines]
         
         # Parsed data
         self.metadata: Dict[str, str] = {}
@@ -40,23 +101,23 @@ class UniversalScriptParser:
         """
         patterns_found = set()
         
-        for line in self.lines[:100]:  # Check first 100 lines
-            line = line.strip()
+        for info in self._line_info[:100]:  # Check first 100 lines
+            line = info.text
             
             # Pattern 1: Agent: or Agent (Name):
-            if re.match(r'^Agent\s*(\([^)]*\))?:', line, re.IGNORECASE):
+            if _AGENT_COLON_RE.match(line):
                 patterns_found.add('agent_colon')
             
             # Pattern 2: Name: (like Clare:, Sarah:, John:)
-            if re.match(r'^[A-Z][a-z]+:', line):
+            if _NAME_COLON_RE.match(line):
                 patterns_found.add('name_colon')
             
             # Pattern 3: (Name): like (Sarah):
-            if re.match(r'^\([A-Z][a-z\s]+\):', line):
+            if _NAME_PARENS_RE.match(line):
                 patterns_found.add('name_parens')
             
             # Pattern 4: Just quoted text
-            if re.match(r'^"[^"]+"$', line):
+            if _QUOTED_RE.match(line):
                 patterns_found.add('quoted_only')
         
         logger.info(f"🔍 Detected agent patterns: {patterns_found}")
@@ -69,23 +130,22 @@ class UniversalScriptParser:
         all_caps_count = 0
         title_case_count = 0
         
-        for line in self.lines:
-            line = line.strip()
+        for info in self._line_info:
+            line = info.text
             
             # Skip obvious non-headers
             if not line or len(line) < 3:
                 continue
             if line.startswith(('Agent', 'If', 'IF', '"', '(')):
                 continue
-            if ':' in line and len(line.split(':')[0]) < 30:
+            if ':' in line and len(line.partition(':')[0]) < 30:
                 continue  # Likely metadata
             
             # Check patterns
-            word_count = len(line.split())
-            if 1 <= word_count <= 8:
-                if line.isupper():
+            if 1 <= info.word_count <= 8:
+                if info.is_upper:
                     all_caps_count += 1
-                elif line.istitle():
+                elif info.is_title:
                     title_case_count += 1
         
         if all_caps_count > title_case_count:
@@ -99,6 +159,9 @@ class UniversalScriptParser:
         """Main parser"""
         logger.info("🔄 Starting universal parsing...")
         
+        # Step 0: Classify every line once
+        self._stripped, self._kinds = self._classify_lines()
+        
         # Step 1: Extract metadata
         self._extract_metadata()
         
@@ -108,20 +171,43 @@ class UniversalScriptParser:
         # Step 3: Parse sections
         self._parse_sections()
         
+        # Per-line working data is only needed while parsing, and parsers are
+        # cached for the life of the app, so don't keep it around
+        del self._line_info, self._stripped, self._kinds
+        
         logger.info(f"✅ Parsed {len(self.sections)} sections, {len(self.variables)} variables")
     
+    def _classify_lines(self) -> Tuple[List[str], List[int]]:
+        """
+        Strip and classify each line once (empty, header, agent or content).
+        Header detection wins over agent detection, as in the section scan.
+        """
+        stripped = [info.text for info in self._line_info]
+        kinds = []
+        
+        for info in self._line_info:
+            line = info.text
+            if not line:
+                kinds.append(_EMPTY)
+            elif self._is_header_line(info):
+                kinds.append(_HEADER)
+            elif self._is_agent_line(line):
+                kinds.append(_AGENT)
+            else:
+                kinds.append(_CONTENT)
+        
+        return stripped, kinds
+    
     def _extract_metadata(self):
         """Extract metadata from header (first section)"""
         in_metadata = True
         
-        for line in self.lines[:30]:
-            line = line.strip()
-            
-            if not line:
+        for line, kind in zip(self._stripped[:30], self._kinds):
+            if kind == _EMPTY:
                 continue
             
             # Stop at first clear section header
-            if self._is_likely_section_header(line):
+            if kind == _HEADER:
                 in_metadata = False
                 break
             
@@ -142,8 +228,11 @@ class UniversalScriptParser:
     
     def _extract_variables(self):
         """Extract {{variable}} placeholders"""
-        pattern = r'\{\{([a-zA-Z_][a-zA-Z0-9_]*)\}\}'
-        matches = re.findall(pattern, self.raw_text)
+        # Most scripts have none; a substring check skips the regex scan
+        if '{{' not in self.raw_text:
+            return
+        
+        matches = _VARIABLE_RE.findall(self.raw_text)
         self.variables = set(matches)
         
         if self.variables:
@@ -154,40 +243,43 @@ class UniversalScriptParser:
         Universal section header detection.
         Works with ANY format - no hardcoding.
         """
-        line = line.strip()
+        return self._is_header_line(LineInfo.from_line(line))
+    
+    def _is_header_line(self, info: LineInfo) -> bool:
+        """Section header detection on a pre-measured line"""
+        line = info.text
         
         if not line or len(line) < 3:
             return False
         
         # NOT a header if:
         
-        # 1. Starts with agent indicators
-        if re.match(r'^(Agent|If|IF|When|WHEN|Unless|UNLESS|User|Customer)\s*[:(]', line, re.IGNORECASE):
-            return False
-        
-        # 2. Is a quoted string
+        # 1. Is a quoted string
         if line.startswith('"') or line.endswith('"'):
             return False
         
-        # 3. Starts with parenthesis (like explanations)
+        # 2. Starts with parenthesis (like explanations)
         if line.startswith('('):
             return False
         
+        # 3. Starts with agent indicators (regex only if the first letter fits)
+        if line[0] in _HEADER_EXCLUDE_FIRST_CHARS and _HEADER_EXCLUDE_RE.match(line):
+            return False
+        
         # 4. Is metadata (key: value with short key at start of document)
         if ':' in line:
-            key_part = line.split(':')[0]
+            key_part, _, value_part = line.partition(':')
             # If key is short and at doc start, probably metadata
             if len(key_part) < 30:
                 # But could also be section like "Objection: Not Interested"
                 # Headers usually don't have long text after colon
-                value_part = line.split(':', 1)[1] if len(line.split(':', 1)) > 1 else ''
                 if len(value_part) > 50:
                     return False  # Probably metadata or content
         
         # IS a header if:
         
         # 1. Short phrase (1-8 words)
-        word_count = len(line.split())
+        word_count = info.word_count
         if word_count < 1 or word_count > 8:
             return False
         
@@ -197,26 +289,20 @@ class UniversalScriptParser:
             return False
         
         # 3. Matches common patterns
-        is_all_caps = line.isupper()
-        is_title_case = line.istitle()
+        is_all_caps = info.is_upper
+        is_title_case = info.is_title
         
         # Additional check: common section keywords
-        section_keywords = [
-            'start', 'end', 'opening', 'closing', 'introduction', 'greeting',
-            'collection', 'details', 'information', 'booking', 'confirmation',
-            'objection', 'handling', 'qualification', 'verification', 'call'
-        ]
-        
-        line_lower = line.lower()
-        has_section_keyword = any(keyword in line_lower for keyword in section_keywords)
-        
-        # Score-based decision
-        score = 0
-        if is_all_caps: score += 3
-        if is_title_case: score += 2
-        if has_section_keyword: score += 2
-        if word_count <= 4: score += 1
-        if 5 <= word_count <= 8: score += 0.5
+        has_section_keyword = _SECTION_KEYWORD_RE.search(line.lower()) is not None
+        
+        # Score-based decision (booleans count as 0/1)
+        score = (
+            3 * is_all_caps
+            + 2 * is_title_case
+            + 2 * has_section_keyword
+            + 1 * (word_count <= 4)
+            + 0.5 * (5 <= word_count <= 8)
+        )
         
         return score >= 2
     
@@ -230,20 +316,24 @@ class UniversalScriptParser:
         if not line:
             return False
         
+        # Every pattern needs a colon or an opening quote
+        if ':' not in line and line[0] != '"':
+            return False
+        
         # Pattern 1: Agent: or Agent (Name):
-        if re.match(r'^Agent\s*(\([^)]*\))?:', line, re.IGNORECASE):
+        if _AGENT_COLON_RE.match(line):
             return True
         
         # Pattern 2: Name: (capitalized name followed by colon)
-        if re.match(r'^[A-Z][a-z]{2,15}:', line):
+        if _AGENT_NAME_COLON_RE.match(line):
             return True
         
         # Pattern 3: (Name): 
-        if re.match(r'^\([A-Z][a-z\s]+\):', line):
+        if _NAME_PARENS_RE.match(line):
             return True
         
         # Pattern 4: Quoted dialogue on its own line
-        if re.match(r'^"[^"]+"$', line) and len(line) > 10:
+        if _QUOTED_RE.match(line) and len(line) > 10:
             return True
         
         return False
@@ -254,17 +344,21 @@ class UniversalScriptParser:
         current_content = []
         current_agent_lines = []
         
+        stripped = self._stripped
+        kinds = self._kinds
+        
         i = 0
-        while i < len(self.lines):
-            line = self.lines[i].strip()
+        while i < len(kinds):
+            kind = kinds[i]
+            line = stripped[i]
             
             # Skip empty
-            if not line:
+            if kind == _EMPTY:
                 i += 1
                 continue
             
             # Check if section header
-            if self._is_likely_section_header(line):
+            if kind == _HEADER:
                 # Save previous section
                 if current_section:
                     self._save_section(current_section, current_content, current_agent_lines)
@@ -277,7 +371,7 @@ class UniversalScriptParser:
                 continue
             
             # Check if agent line
-            if self._is_agent_line(line):
+            if kind == _AGENT:
                 # Extract agent dialogue (could be multi-line)
                 agent_text, lines_consumed = self._extract_agent_dialogue(i)
                 
@@ -307,24 +401,22 @@ class UniversalScriptParser:
         Extract agent dialogue starting at start_idx.
         Returns: (cleaned_dialogue, lines_consumed)
         """
+        stripped = self._stripped
+        kinds = self._kinds
         lines_consumed = 1
-        dialogue_parts = [self.lines[start_idx].strip()]
+        dialogue_parts = [stripped[start_idx]]
         
         # Check if multi-line dialogue
         i = start_idx + 1
-        while i < len(self.lines):
-            next_line = self.lines[i].strip()
+        while i < len(kinds):
+            next_line = stripped[i]
             
             # Stop if we hit another section, agent line, or empty
-            if not next_line:
-                break
-            if self._is_likely_section_header(next_line):
-                break
-            if self._is_agent_line(next_line):
+            if kinds[i] != _CONTENT:
                 break
             
             # Stop if it looks like a new statement (starts with IF, When, etc)
-            if re.match(r'^(If |IF |When |WHEN |Unless )', next_line, re.IGNORECASE):
+            if next_line[0] in _STATEMENT_FIRST_CHARS and _STATEMENT_START_RE.match(next_line):
                 break
             
             # Add to dialogue
@@ -340,28 +432,23 @@ class UniversalScriptParser:
     
     def _clean_agent_text(self, text: str) -> str:
         """Remove agent prefixes and clean up text"""
-        # Remove Agent: and variants
-        text = re.sub(r'^Agent\s*(\([^)]*\))?:\s*', '', text, flags=re.IGNORECASE)
-        
-        # Remove name prefixes like "Clare:" or "(Sarah):"
-        text = re.sub(r'^[A-Z][a-z]+:\s*', '', text)
-        text = re.sub(r'^\([A-Z][a-z\s]+\):\s*', '', text)
+        # Remove Agent: and variants, then name prefixes like "Clare:" or "(Sarah):"
+        text = text[_CLEAN_PREFIX_RE.match(text).end():]
         
         # Remove surrounding quotes
         text = text.strip('"\'')
         
         # Clean whitespace
-        text = ' '.join(text.split())
-        
-        return text.strip()
+        return ' '.join(text.split())
     
     def _extract_all_agent_lines(self) -> List[str]:
         """Extract all agent lines if no sections detected"""
         agent_lines = []
         
-        for line in self.lines:
-            if self._is_agent_line(line.strip()):
-                cleaned = self._clean_agent_text(line.strip())
+        # Only used when no header was found, so every agent line is classified as one
+        for line, kind in zip(self._stripped, self._kinds):
+            if kind == _AGENT:
+                cleaned = self._clean_agent_text(line)
                 if cleaned:
                     agent_lines.append(cleaned)
         
@@ -384,12 +471,14 @@ class UniversalScriptParser:
     
     def get_opening_message(self) -> str:
         """Get first agent line"""
+        return self.opening_message
+    
+    @cached_property
+    def opening_message(self) -> str:
+        """First agent line (sections are fixed after parsing, so found once)"""
         # Look for START/OPENING/GREETING section
-        start_keywords = ['start', 'open', 'greet', 'begin', 'hello']
-        
         for section in self.sections:
-            section_name_lower = section['name'].lower()
-            if any(kw in section_name_lower for kw in start_keywords):
+            if _START_KEYWORD_RE.search(section['name'].lower()):
                 if section['agent_lines']:
                     return section['agent_lines'][0]
         
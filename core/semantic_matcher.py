@@ -1,21 +1,87 @@
 """
 Semantic Matcher - Find relevant script sections (Minimal version)
 Uses TF-IDF instead of sentence transformers for lighter dependencies
+(feature-hashed, so there is no vocabulary to build or look up)
 """
 
-from typing import List, Dict, Tuple
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Dict, Optional, Tuple
+import hashlib
+import os
+import joblib  # ships with scikit-learn
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+import sklearn
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
+from sklearn.metrics.pairwise import linear_kernel
+from sklearn.pipeline import Pipeline
 
-class SemanticMatcher:
-    def __init__(self):
-        """Initialize semantic matcher with TF-IDF"""
-        self.vectorizer = TfidfVectorizer(
-            max_features=1000,
-            ngram_range=(1, 3),
+
+def _new_vectorizer() -> Pipeline:
+    """
+    TF-IDF settings shared by every matcher.
+    Hashing has no fit step or vocabulary dict; only the IDF weights are
+    learned from the sections.
+    """
+    return Pipeline([
+        ('hash', HashingVectorizer(
+            n_features=4096,
+            ngram_range=(1, 2),
+            alternate_sign=False,
+            norm='l2',
             stop_words='english'
-        )
+        )),
+        ('tfidf', TfidfTransformer())
+    ])
+
+
+def _fit_cache_file(texts: Tuple[str, ...], cache_dir: str) -> Path:
+    """Cache file for a fit: keyed by texts, vectorizer settings and sklearn version"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{sklearn.__version__}|{sorted(_new_vectorizer().get_params().items())}".encode('utf-8'))
+    for text in texts:
+        digest.update(b'\x00' + text.encode('utf-8'))
+    return Path(cache_dir) / f"tfidf_{digest.hexdigest()}.joblib"
+
+
+@lru_cache(maxsize=32)
+def _fit_sections(texts: Tuple[str, ...], cache_dir: Optional[str] = None):
+    """
+    Fit TF-IDF on section texts once per distinct script.
+    The fitted vectorizer and matrix are only read afterwards, so matchers
+    loading the same script share them. With a cache_dir, fits are also
+    persisted so other processes load (memory-mapped) instead of refitting.
+    """
+    cache_file = None
+    if cache_dir:
+        cache_file = _fit_cache_file(texts, cache_dir)
+        if cache_file.exists():
+            try:
+                return joblib.load(cache_file, mmap_mode='r')
+            except Exception as e:
+                print(f"Ignoring unreadable TF-IDF cache {cache_file}: {e}")
+    
+    vectorizer = _new_vectorizer()
+    fitted = (vectorizer, vectorizer.fit_transform(texts))
+    
+    if cache_file is not None:
+        try:
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            # Write then rename so concurrent readers never see a partial file
+            tmp_file = cache_file.with_suffix(f'.{os.getpid()}.tmp')
+            joblib.dump(fitted, tmp_file)
+            os.replace(tmp_file, cache_file)
+        except OSError as e:
+            print(f"Could not persist TF-IDF cache {cache_file}: {e}")
+    
+    return fitted
+
+
+class SemanticMatcher:
+    def __init__(self, cache_dir: Optional[str] = None):
+        """Initialize semantic matcher with TF-IDF (optionally persisting fits to cache_dir)"""
+        self.cache_dir = cache_dir
+        self.vectorizer = _new_vectorizer()
         self.script_embeddings = None
         self.script_sections = []
         
@@ -50,13 +116,18 @@ class SemanticMatcher:
                 
                 texts.append(' '.join(text_parts))
             
-            # Fit and transform
-            self.script_embeddings = self.vectorizer.fit_transform(texts)
+            # Fit and transform (cached per distinct set of section texts)
+            self.vectorizer, self.script_embeddings = _fit_sections(tuple(texts), self.cache_dir)
             
         except Exception as e:
             print(f"Error encoding sections: {e}")
             raise
     
+    @staticmethod
+    def clear_cache() -> None:
+        """Drop in-memory TF-IDF fits (files in a cache_dir are kept)"""
+        _fit_sections.cache_clear()
+    
     def find_relevant_sections(
         self,
         user_input: str,
@@ -79,25 +150,71 @@ class SemanticMatcher:
             # Encode user input
             user_embedding = self.vectorizer.transform([user_input])
             
-            # Calculate similarities
-            similarities = cosine_similarity(user_embedding, self.script_embeddings)[0]
+            # Calculate similarities: TF-IDF rows are already L2-normalized
+            # (norm='l2'), so the plain dot product is the cosine similarity
+            similarities = linear_kernel(user_embedding, self.script_embeddings)[0]
             
-            # Get top k matches
-            top_indices = np.argsort(similarities)[::-1][:top_k]
+            return self._matches(similarities, top_k)
             
-            results = []
-            for idx in top_indices:
-                score = float(similarities[idx])
-                
-                # Only include if above threshold (0.1 for minimal matching)
-                if score >= 0.1:
-                    results.append((self.script_sections[idx], score))
+        except Exception as e:
+            print(f"Error finding sections: {e}")
+            return []
+    
+    def find_relevant_sections_batch(
+        self,
+        user_inputs: List[str],
+        top_k: int = 3
+    ) -> List[List[Tuple[Dict, float]]]:
+        """
+        Find relevant script sections for several user inputs at once
+        (e.g. one turn from each active chat)
+        
+        Args:
+            user_inputs: User messages
+            top_k: Number of sections to return per message
             
-            return results
+        Returns:
+            One list of (section, similarity_score) tuples per input
+        """
+        try:
+            if self.script_embeddings is None or not user_inputs:
+                return [[] for _ in user_inputs]
+            
+            # One sparse product scores every input against every section
+            user_embeddings = self.vectorizer.transform(user_inputs)
+            similarities = linear_kernel(user_embeddings, self.script_embeddings)
+            
+            return [self._matches(row, top_k) for row in similarities]
             
         except Exception as e:
             print(f"Error finding sections: {e}")
-            return []
+            return [[] for _ in user_inputs]
+    
+    def _matches(self, similarities: np.ndarray, top_k: int) -> List[Tuple[Dict, float]]:
+        """Top sections for one row of similarities"""
+        # Get top k matches (best first, ties by section order)
+        top_indices = self._top_indices(similarities, top_k)
+        
+        results = []
+        for idx in top_indices:
+            score = float(similarities[idx])
+            
+            # Only include if above threshold (0.1 for minimal matching)
+            if score >= 0.1:
+                results.append((self.script_sections[idx], score))
+        
+        return results
+    
+    @staticmethod
+    def _top_indices(similarities: np.ndarray, top_k: int) -> np.ndarray:
+        """Indices of the top_k scores, partitioning first so only those get sorted"""
+        candidates = np.arange(len(similarities))
+        if 0 < top_k < len(similarities):
+            # Keep everything tied with the k-th best so ties resolve by index
+            kth_best = -np.partition(-similarities, top_k - 1)[top_k - 1]
+            candidates = np.flatnonzero(similarities >= kth_best)
+        order = np.lexsort((candidates, -similarities[candidates]))
+        return candidates[order][:top_k]
     
     def find_section_by_name(self, section_name: str) -> Tuple[Dict, float]:
         """
@@ -3,12 +3,56 @@ Response Validator
 Validates that generated responses match the script and meet quality standards
 """
 
+from collections import Counter
+from functools import lru_cache
 from typing import Dict, List, Tuple
 import re
 import logging
 
 logger = logging.getLogger(__name__)
 
+_WORD_RE = re.compile(r'\b\w+\b')
+_SENTENCE_SPLIT_RE = re.compile(r'[.!?]+')
+
+# ASCII characters that are not \w, mapped to spaces: for ASCII text,
+# translate + split yields exactly the _WORD_RE tokens without the regex
+_NON_WORD_ASCII = ''.join(
+    c for c in map(chr, range(128)) if not (c.isalnum() or c == '_')
+)
+_NON_WORD_TABLE = str.maketrans(_NON_WORD_ASCII, ' ' * len(_NON_WORD_ASCII))
+
+
+def _words(text: str) -> List[str]:
+    """Lowercased words of text (regex only needed for non-ASCII text)"""
+    text = text.lower()
+    if text.isascii():
+        return text.translate(_NON_WORD_TABLE).split()
+    return _WORD_RE.findall(text)
+
+# Uncertainty phrases that suggest the model is making things up
+_HALLUCINATION_PHRASES = (
+    'i believe', 'i think', 'probably', 'might be',
+    'could be', 'in my opinion', 'generally speaking',
+    'usually', 'typically', 'as far as i know',
+    'to the best of my knowledge', 'i assume'
+)
+_HALLUCINATION_RE = re.compile('|'.join(map(re.escape, _HALLUCINATION_PHRASES)))
+_SPECIFIC_NUMBER_RE = re.compile(r'\$\d+\.\d{2}|\d{1,2}%')
+_SPECIFIC_DATE_RE = re.compile(r'\d{1,2}/\d{1,2}/\d{4}')
+
+# Requests for sensitive information
+_INAPPROPRIATE_TERMS = (
+    'password', 'credit card', 'social security', 'ssn',
+    'pin number', 'cvv', 'bank account', 'routing number'
+)
+_INAPPROPRIATE_RE = re.compile('|'.join(map(re.escape, _INAPPROPRIATE_TERMS)))
+
+
+@lru_cache(maxsize=1024)
+def _section_words(text: str) -> frozenset:
+    """Lowercased word set of a script section (sections repeat across validations)"""
+    return frozenset(_words(text))
+
 
 class ResponseValidator:
     """
@@ -52,14 +96,15 @@ class ResponseValidator:
             warnings.append(f"Response too long ({len(response)} chars)")
             confidence -= 0.1
         
-        # Check 2: Script overlap
-        overlap_score = self._calculate_script_overlap(response, relevant_sections)
-        if overlap_score < 0.2:
-            issues.append(f"Low script overlap ({overlap_score:.2%})")
-            confidence -= 0.4
-        elif overlap_score < 0.4:
-            warnings.append(f"Medium script overlap ({overlap_score:.2%})")
-            confidence -= 0.1
+        # Cheap checks first (single regex scans) so the overlap check,
+        # which tokenizes the script sections, can be skipped when the
+        # response is already rejected
+        
+        # Check 2: Inappropriate content
+        has_inappropriate = self._check_inappropriate_content(response)
+        if has_inappropriate:
+            issues.append("Inappropriate content detected")
+            confidence -= 0.6
         
         # Check 3: Hallucination detection
         has_hallucination = self._detect_hallucination(response)
@@ -67,18 +112,23 @@ class ResponseValidator:
             issues.append("Possible hallucination detected")
             confidence -= 0.5
         
-        # Check 4: Inappropriate content
-        has_inappropriate = self._check_inappropriate_content(response)
-        if has_inappropriate:
-            issues.append("Inappropriate content detected")
-            confidence -= 0.6
-        
-        # Check 5: Repetition check
+        # Check 4: Repetition check
         is_repetitive = self._check_repetition(response)
         if is_repetitive:
             warnings.append("Response may be repetitive")
             confidence -= 0.1
         
+        # Check 5: Script overlap (None when skipped)
+        overlap_score = None
+        if not issues and confidence >= self.min_confidence:
+            overlap_score = self._calculate_script_overlap(response, relevant_sections)
+            if overlap_score < 0.2:
+                issues.append(f"Low script overlap ({overlap_score:.2%})")
+                confidence -= 0.4
+            elif overlap_score < 0.4:
+                warnings.append(f"Medium script overlap ({overlap_score:.2%})")
+                confidence -= 0.1
+        
         # Check 6: Intent alignment
         intent_aligned = self._check_intent_alignment(response, intent_data)
         if not intent_aligned:
@@ -109,47 +159,36 @@ class ResponseValidator:
         if not relevant_sections:
             return 0.0
         
-        # Get all script text
-        script_text = " ".join([section['text'] for section in relevant_sections])
-        
-        # Tokenize
+        # Tokenize (section word sets are cached per section text)
         response_words = set(self._tokenize(response.lower()))
-        script_words = set(self._tokenize(script_text.lower()))
+        section_words = [_section_words(section['text']) for section in relevant_sections]
         
         if not response_words:
             return 0.0
         
         # Calculate overlap
-        overlap = len(response_words.intersection(script_words)) / len(response_words)
+        shared = sum(
+            1 for word in response_words
+            if any(word in words for words in section_words)
+        )
+        overlap = shared / len(response_words)
         
         return overlap
     
     def _tokenize(self, text: str) -> List[str]:
         """Tokenize text into words"""
         # Remove punctuation and split
-        words = re.findall(r'\b\w+\b', text.lower())
-        return words
+        return _words(text)
     
     def _detect_hallucination(self, response: str) -> bool:
         """Detect common hallucination patterns"""
-        response_lower = response.lower()
-        
-        # Hallucination indicators
-        hallucination_phrases = [
-            'i believe', 'i think', 'probably', 'might be',
-            'could be', 'in my opinion', 'generally speaking',
-            'usually', 'typically', 'as far as i know',
-            'to the best of my knowledge', 'i assume'
-        ]
-        
-        # Check for uncertainty phrases
-        for phrase in hallucination_phrases:
-            if phrase in response_lower:
-                return True
+        # Check for uncertainty phrases (one scan for all of them)
+        if _HALLUCINATION_RE.search(response.lower()):
+            return True
         
         # Check for made-up numbers/dates without context
-        has_specific_numbers = bool(re.search(r'\$\d+\.\d{2}|\d{1,2}%', response))
-        has_specific_dates = bool(re.search(r'\d{1,2}/\d{1,2}/\d{4}', response))
+        has_specific_numbers = bool(_SPECIFIC_NUMBER_RE.search(response))
+        has_specific_dates = bool(_SPECIFIC_DATE_RE.search(response))
         
         if has_specific_numbers or has_specific_dates:
             # These should only appear if they're in the script
@@ -162,43 +201,43 @@ class ResponseValidator:
         """Check for inappropriate content"""
         response_lower = response.lower()
         
-        # Inappropriate patterns
-        inappropriate = [
-            'password', 'credit card', 'social security', 'ssn',
-            'pin number', 'cvv', 'bank account', 'routing number'
-        ]
-        
-        # Check if asking for sensitive info
-        for term in inappropriate:
-            if term in response_lower:
-                logger.warning(f"Inappropriate content detected: {term}")
-                return True
+        # Check if asking for sensitive info (one scan for all terms)
+        if not _INAPPROPRIATE_RE.search(response_lower):
+            return False
         
-        return False
+        # Report the first listed term, as the per-term loop did
+        term = next(term for term in _INAPPROPRIATE_TERMS if term in response_lower)
+        logger.warning(f"Inappropriate content detected: {term}")
+        return True
     
     def _check_repetition(self, response: str) -> bool:
         """Check if response is overly repetitive"""
         # Split into sentences
-        sentences = re.split(r'[.!?]+', response)
+        sentences = _SENTENCE_SPLIT_RE.split(response)
         sentences = [s.strip() for s in sentences if s.strip()]
         
         if len(sentences) < 2:
             return False
         
-        # Check for repeated sentences
-        unique_sentences = set(sentences)
-        if len(unique_sentences) < len(sentences) * 0.8:
-            return True
+        # Check for repeated sentences (stop once over 20% are duplicates)
+        max_duplicates = len(sentences) * 0.2
+        seen = set()
+        duplicates = 0
+        for sentence in sentences:
+            if sentence in seen:
+                duplicates += 1
+                if duplicates > max_duplicates:
+                    return True
+            else:
+                seen.add(sentence)
         
         # Check for repeated words
         words = self._tokenize(response)
         if len(words) < 5:
             return False
         
-        word_counts = {}
-        for word in words:
-            if len(word) > 3:  # Only check meaningful words
-                word_counts[word] = word_counts.get(word, 0) + 1
+        # Only check meaningful words
+        word_counts = Counter(word for word in words if len(word) > 3)
         
         # If any word appears more than 30% of the time
         max_count = max(word_counts.values()) if word_counts else 0
@@ -238,7 +277,8 @@ class ResponseValidator:
             suggestions.append("Expand response with more detail from script")
         
         # If low overlap, suggest using more script content
-        if validation_result.get('overlap_score', 1.0) < 0.3:
+        overlap_score = validation_result.get('overlap_score')
+        if overlap_score is not None and overlap_score < 0.3:
             suggestions.append("Use more exact phrases from script")
         
         # If has issues, suggest reverting to exact script
@@ -15,15 +15,17 @@ else
 fi
 
 # Start Ollama service
+# OLLAMA_NUM_PARALLEL lets the server decode requests from several
+# concurrent chat sessions at once instead of queueing them
 echo ""
 echo "Starting Ollama service..."
-ollama serve &
+OLLAMA_NUM_PARALLEL=${OLLAMA_NUM_PARALLEL:-4} ollama serve &
 sleep 5
 
 # Download recommended model
 echo ""
-echo "Downloading Qwen 2.5:7b model (this may take a few minutes)..."
-ollama pull qwen2.5:7b
+echo "Downloading Qwen 2.5:7b (Q4_K_M) model (this may take a few minutes)..."
+ollama pull qwen2.5:7b-instruct-q4_K_M
 
 echo ""
 echo "✅ Ollama model downloaded!"
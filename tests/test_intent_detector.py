@@ -0,0 +1,45 @@
+"""
+IntentDetector tests (run with: python -m unittest)
+"""
+
+import copy
+import unittest
+
+from core.intent_detector import IntentDetector
+
+
+class DetectCacheTests(unittest.TestCase):
+
+    def test_callers_get_their_own_containers(self):
+        detector = IntentDetector()
+        first = detector.detect("John paid $50 and $60, sounds good")
+        second = detector.detect("John paid $50 and $60, sounds good")
+
+        self.assertEqual(first, second)
+        self.assertIsNot(first['entities'], second['entities'])
+        self.assertIsNot(first['entities']['amount'], second['entities']['amount'])
+        self.assertIsNot(first['all_intents'], second['all_intents'])
+
+    def test_mutating_a_result_does_not_change_later_hits(self):
+        detector = IntentDetector()
+        result = detector.detect("John paid $50 and $60, sounds good")
+        expected = copy.deepcopy(result)
+
+        result['entities']['amount'].append('999')
+        result['entities']['email'] = 'x@example.com'
+        result['all_intents'].append('OBJECTION')
+        result['primary_intent'] = 'OBJECTION'
+
+        self.assertEqual(detector.detect("John paid $50 and $60, sounds good"), expected)
+
+    def test_result_types_match_the_documented_shape(self):
+        result = IntentDetector().detect("Call me tomorrow at 10:30 am")
+
+        self.assertIsInstance(result, dict)
+        self.assertIsInstance(result['all_intents'], list)
+        self.assertIsInstance(result['entities'], dict)
+        self.assertIsInstance(result['entities']['potential_names'], list)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,213 @@
+"""
+Response cache and batch tests for OllamaEngine (run with: python -m unittest)
+"""
+
+from types import SimpleNamespace
+import threading
+import time
+import unittest
+
+import config
+from core.ollama_engine import FlowContext, OllamaEngine
+
+
+class FakeClient:
+    """
+    Stands in for ollama.Client: every chat call returns a new reply.
+    Records the threads chat ran on and how many calls overlapped; a prompt
+    containing FAIL_MARKER makes chat raise.
+    """
+
+    FAIL_MARKER = 'trigger-a-failure'
+
+    def __init__(self, model: str, chat_delay: float = 0.0):
+        self.model = model
+        self.chat_delay = chat_delay
+        self.chat_calls = 0
+        self.chat_threads = set()
+        self.max_concurrent_chats = 0
+        self._active_chats = 0
+        self._lock = threading.Lock()
+
+    def list(self):
+        return {'models': [{'name': self.model}]}
+
+    def generate(self, **kwargs):
+        return {'response': ''}
+
+    def chat(self, messages, **kwargs):
+        with self._lock:
+            self.chat_calls += 1
+            reply_number = self.chat_calls
+            self.chat_threads.add(threading.get_ident())
+            self._active_chats += 1
+            self.max_concurrent_chats = max(self.max_concurrent_chats, self._active_chats)
+        try:
+            time.sleep(self.chat_delay)
+            if self.FAIL_MARKER in messages[-1]['content']:
+                raise RuntimeError("model error")
+            return {'message': {'content': f"Reply number {reply_number}"}}
+        finally:
+            with self._lock:
+                self._active_chats -= 1
+
+    def embed(self, model, input, keep_alive=None):
+        # Same vector for every input: any paraphrase lookup would hit
+        return {'embeddings': [[1.0, 0.0] for _ in input]}
+
+
+def make_engine(embed_model: str = '', chat_delay: float = 0.0, **overrides) -> OllamaEngine:
+    """Engine on a FakeClient; overrides replace config settings by name"""
+    settings = SimpleNamespace(**{
+        name: getattr(config, name) for name in dir(config) if name.isupper()
+    })
+    settings.RESPONSE_CACHE_EMBED_MODEL = embed_model
+    for name, value in overrides.items():
+        setattr(settings, name, value)
+    return OllamaEngine(settings, client=FakeClient(settings.OLLAMA_MODEL, chat_delay))
+
+
+def turn(user_input: str, section: str = 'INTRODUCTION', agent_line: str = '') -> dict:
+    """generate_response keyword arguments for one turn"""
+    return {
+        'user_input': user_input,
+        'intent_data': {},
+        'flow_context': FlowContext(section=section, phase=section, agent_line=agent_line),
+        'conversation_history': [],
+        'script_metadata': {'agent_name': 'Clare'}
+    }
+
+
+class ResponseCacheScriptTests(unittest.TestCase):
+    # No agent line, so every turn goes to the model (and the cache)
+    flow_context = FlowContext(section='INTRODUCTION', phase='INTRODUCTION')
+
+    script_a = {'agent_name': 'Clare', 'tone': 'warm', 'call_type': 'outbound'}
+    script_b = {'agent_name': 'Sam', 'tone': 'formal', 'call_type': 'inbound'}
+
+    def generate(self, engine: OllamaEngine, metadata: dict, user_input: str = 'who is this?') -> dict:
+        return engine.generate_response(
+            user_input=user_input,
+            intent_data={},
+            flow_context=self.flow_context,
+            conversation_history=[],
+            script_metadata=metadata
+        )
+
+    def test_same_script_reuses_reply(self):
+        engine = make_engine()
+        first = self.generate(engine, self.script_a)
+        second = self.generate(engine, self.script_a)
+
+        self.assertEqual(second['method'], 'response_cache')
+        self.assertEqual(second['response'], first['response'])
+        self.assertEqual(engine.client.chat_calls, 1)
+
+    def test_scripts_sharing_flow_context_do_not_share_replies(self):
+        engine = make_engine()
+        reply_a = self.generate(engine, self.script_a)
+        reply_b = self.generate(engine, self.script_b)
+
+        self.assertEqual(reply_b['method'], 'ollama_flow_guided')
+        self.assertNotEqual(reply_b['response'], reply_a['response'])
+        self.assertEqual(engine.client.chat_calls, 2)
+
+    def test_semantic_cache_is_scoped_to_script(self):
+        engine = make_engine(embed_model='fake-embed')
+        self.generate(engine, self.script_a, 'who is this?')
+
+        paraphrase_same_script = self.generate(engine, self.script_a, 'who are you?')
+        paraphrase_other_script = self.generate(engine, self.script_b, 'who are you?')
+
+        self.assertEqual(paraphrase_same_script['method'], 'semantic_cache')
+        self.assertEqual(paraphrase_other_script['method'], 'ollama_flow_guided')
+
+
+class GenerateResponseBatchTests(unittest.TestCase):
+
+    def test_results_come_back_in_input_order(self):
+        engine = make_engine(chat_delay=0.01, OLLAMA_NUM_PARALLEL=4)
+        sections = [f"SECTION {i}" for i in range(8)]
+        turns = [turn(f"question {i}", section) for i, section in enumerate(sections)]
+        # Scripted lines skip the model, so they finish first
+        turns[3] = turn('anything', 'SCRIPTED', agent_line="This line is said exactly as written")
+
+        results = engine.generate_response_batch(turns)
+
+        self.assertEqual(
+            [result['section'] for result in results],
+            sections[:3] + ['SCRIPTED'] + sections[4:]
+        )
+        self.assertEqual(results[3]['method'], 'script_exact')
+        self.assertEqual(engine.client.chat_calls, 7)
+
+    def test_single_turn_runs_inline(self):
+        engine = make_engine()
+        results = engine.generate_response_batch([turn('hello')])
+
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0]['method'], 'ollama_flow_guided')
+        self.assertEqual(engine.client.chat_threads, {threading.get_ident()})
+        self.assertEqual(engine.generate_response_batch([]), [])
+
+    def test_num_parallel_caps_workers(self):
+        engine = make_engine(chat_delay=0.02, OLLAMA_NUM_PARALLEL=2)
+        engine.generate_response_batch([turn(f"question {i}") for i in range(6)])
+
+        self.assertEqual(engine.client.chat_calls, 6)
+        self.assertLessEqual(len(engine.client.chat_threads), 2)
+        self.assertLessEqual(engine.client.max_concurrent_chats, 2)
+
+    def test_failing_turn_falls_back_without_affecting_others(self):
+        engine = make_engine(OLLAMA_NUM_PARALLEL=3)
+        turns = [
+            turn('first question'),
+            # Too short to be said as-is, so it goes to the model
+            turn(f"please {FakeClient.FAIL_MARKER}", agent_line='Short line'),
+            turn('third question'),
+        ]
+
+        results = engine.generate_response_batch(turns)
+
+        self.assertEqual(results[0]['method'], 'ollama_flow_guided')
+        # generate_response answers a model error from the script line
+        self.assertEqual(results[1]['method'], 'fallback_script_exact')
+        self.assertEqual(results[1]['response'], 'Short line.')
+        self.assertEqual(results[2]['method'], 'ollama_flow_guided')
+
+
+
+class BatchDeduplicationTests(unittest.TestCase):
+
+    def test_duplicate_turns_call_the_model_once(self):
+        engine = make_engine(chat_delay=0.01, OLLAMA_NUM_PARALLEL=4)
+        # Same flow context and input once normalized (case, whitespace)
+        turns = [turn('Who is this?'), turn('other question'), turn('  who IS   this? '), turn('who is this?')]
+
+        results = engine.generate_response_batch(turns)
+
+        self.assertEqual(engine.client.chat_calls, 2)
+        self.assertEqual(results[0], results[2])
+        self.assertEqual(results[0], results[3])
+        self.assertNotEqual(results[0]['response'], results[1]['response'])
+
+    def test_each_duplicate_gets_its_own_dict(self):
+        engine = make_engine(OLLAMA_NUM_PARALLEL=2)
+        results = engine.generate_response_batch([turn('who is this?')] * 3 + [turn('other')])
+
+        self.assertIsNot(results[0], results[1])
+        self.assertIsNot(results[1], results[2])
+        results[1]['response'] = 'changed'
+        self.assertNotEqual(results[0]['response'], 'changed')
+        self.assertNotEqual(results[2]['response'], 'changed')
+
+    def test_no_deduplication_without_response_cache(self):
+        engine = make_engine(OLLAMA_NUM_PARALLEL=4, RESPONSE_CACHE_SIZE=0)
+        results = engine.generate_response_batch([turn('who is this?')] * 3)
+
+        self.assertEqual(engine.client.chat_calls, 3)
+        self.assertEqual(len({result['response'] for result in results}), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+"""
+ScriptFlowEngine tests (run with: python -m unittest)
+"""
+
+import unittest
+
+from core.script_flow_engine import (
+    _AGREES_BOOKING,
+    _AGREES_INTRODUCTION,
+    _CONFIRMS_OPENING,
+    CompiledScript,
+    ScriptFlowEngine,
+    _scan_user_input,
+)
+
+NEUTRAL = {'primary_intent': 'NEUTRAL', 'sentiment': 'neutral'}
+
+
+def make_engine(*section_names: str) -> ScriptFlowEngine:
+    """Engine on a script whose sections are just named lines"""
+    return ScriptFlowEngine({
+        'metadata': {},
+        'sections': [
+            {'name': name, 'dialogue': f"Line for {name}", 'variables': set()}
+            for name in section_names
+        ]
+    })
+
+
+class ConfirmationWordTests(unittest.TestCase):
+
+    def assertLabels(self, user_input: str, *labels: str):
+        found = _scan_user_input(user_input.lower())
+        for label in labels:
+            self.assertIn(label, found, f"{user_input!r} should give {label}")
+
+    def test_alright_agrees_to_introduction(self):
+        for reply in ('alright', 'Allright', 'alrighty then', 'righto'):
+            self.assertLabels(reply, _AGREES_INTRODUCTION)
+
+    def test_stretched_spellings_still_confirm(self):
+        for reply in ('yess', 'Yesss!', 'yessir', 'yeahhh', 'okk', 'okey', 'okie dokie', 'surely'):
+            self.assertLabels(reply, _CONFIRMS_OPENING, _AGREES_INTRODUCTION, _AGREES_BOOKING)
+
+    def test_plain_confirmations(self):
+        self.assertLabels('yes', _CONFIRMS_OPENING, _AGREES_INTRODUCTION, _AGREES_BOOKING)
+        self.assertLabels('this is John', _CONFIRMS_OPENING)
+        self.assertLabels('go ahead', _AGREES_INTRODUCTION)
+
+    def test_words_containing_confirmations_do_not_count(self):
+        for reply in ('look', 'my eyes', 'goodbye', 'the broker'):
+            found = _scan_user_input(reply)
+            self.assertNotIn(_CONFIRMS_OPENING, found)
+            self.assertNotIn(_AGREES_INTRODUCTION, found)
+            self.assertNotIn(_AGREES_BOOKING, found)
+
+
+
+class CompletedSectionTests(unittest.TestCase):
+
+    def test_opening_and_introduction_record_their_labels(self):
+        engine = make_engine(
+            'CALL START', 'Intro', 'INTRODUCTION', 'Personal Details',
+            'PROPERTY ADDRESS', 'BOOKING APPOINTMENT', 'END'
+        )
+        engine.start_conversation()
+        for text in ('yes', 'yes', 'yes'):
+            engine.get_next_step(text, NEUTRAL)
+
+        # 'INTRODUCTION' names a real section and shares its bit; 'OPENING'
+        # names none and counts on its own, as the completed set did
+        progress = engine.get_progress()
+        self.assertEqual(engine.current_section, 'Personal Details')
+        self.assertEqual(sorted(progress['completed_sections']), ['INTRODUCTION', 'OPENING'])
+        self.assertAlmostEqual(progress['progress_percentage'], 200 / 7)
+
+
+
+class SharedScriptTests(unittest.TestCase):
+
+    def test_mutating_a_step_does_not_leak_into_other_engines(self):
+        compiled = CompiledScript({
+            'metadata': {},
+            'sections': [
+                {'name': 'CALL START', 'dialogue': "Hi, is this {{first_name}}?", 'variables': set()},
+                {'name': 'INTRODUCTION', 'dialogue': "I'm calling about {{property}}.", 'variables': set()},
+            ]
+        })
+        first, second = ScriptFlowEngine(compiled), ScriptFlowEngine(compiled)
+
+        for step in (first.start_conversation(), first.get_next_step('yes', NEUTRAL)):
+            step['agent_line'] = 'changed'
+            step['required_fields'].append('changed')
+            step['phase'] = 'changed'
+
+        self.assertEqual(second.start_conversation(), {
+            'section': 'CALL START',
+            'type': 'OPENING',
+            'agent_line': "Hi, is this {{first_name}}?",
+            'required_fields': ['first_name'],
+            'phase': 'OPENING'
+        })
+        self.assertEqual(second.get_next_step('yes', NEUTRAL), {
+            'section': 'INTRODUCTION',
+            'type': 'INTRODUCTION',
+            'agent_line': "I'm calling about {{property}}.",
+            'required_fields': ['property'],
+            'phase': 'INTRODUCTION'
+        })
+
+
+
+class BatchStepTests(unittest.TestCase):
+
+    script = {
+        'metadata': {},
+        'sections': [
+            {'name': name, 'dialogue': f"Line for {name}", 'variables': set()}
+            for name in (
+                'CALL START', 'INTRODUCTION', 'Personal Details', 'BOOKING APPOINTMENT',
+                'Objection: Not a good time', 'END'
+            )
+        ]
+    }
+    conversations = [
+        ['yes', 'ok sure', 'John Smith', "I'm busy, call back later", 'yes'],
+        ['who?', 'this is him', 'go ahead', 'hmm', 'fine'],
+        ['yes', 'no', 'alright', 'jane@example.com', 'no thanks'],
+    ]
+
+    def test_batch_matches_sequential_steps_for_interleaved_engines(self):
+        compiled = CompiledScript(self.script)
+        sequential = []
+        for inputs in self.conversations:
+            engine = ScriptFlowEngine(compiled)
+            engine.start_conversation()
+            sequential.append([(engine.get_next_step(text, NEUTRAL), engine.get_progress()) for text in inputs])
+
+        engines = [ScriptFlowEngine(compiled) for _ in self.conversations]
+        for engine in engines:
+            engine.start_conversation()
+        # Round-robin: turn i of every conversation, then turn i + 1, ...
+        turns = [
+            (engine, inputs[i], NEUTRAL)
+            for i in range(len(self.conversations[0]))
+            for engine, inputs in zip(engines, self.conversations)
+        ]
+        steps = ScriptFlowEngine.get_next_step_batch(turns)
+
+        for index, engine in enumerate(engines):
+            batch_steps = steps[index::len(engines)]
+            self.assertEqual(batch_steps, [step for step, _ in sequential[index]])
+            self.assertEqual(engine.get_progress(), sequential[index][-1][1])
+
+
+if __name__ == '__main__':
+    unittest.main()
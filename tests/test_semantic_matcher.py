@@ -0,0 +1,71 @@
+"""
+SemanticMatcher tests (run with: python -m unittest)
+"""
+
+import unittest
+
+from core.semantic_matcher import SemanticMatcher
+
+# Sections 1, 3 and 4 have the same text, so their scores tie
+SECTIONS = [
+    {'name': 'Opening', 'dialogue': "Hi, is this a good time to talk about your property?"},
+    {'name': 'Booking', 'dialogue': "Would you like to book a free valuation appointment?"},
+    {'name': 'Objection: busy', 'dialogue': "No problem, when would be a better time to call back?"},
+    {'name': 'Booking', 'dialogue': "Would you like to book a free valuation appointment?"},
+    {'name': 'Booking', 'dialogue': "Would you like to book a free valuation appointment?"},
+    {'name': 'Closing', 'dialogue': "Thank you for your time, goodbye."},
+]
+
+QUERIES = [
+    "can I book an appointment",
+    "book valuation",
+    "I'm busy, call back later",
+    "what time is good",
+    "goodbye",
+    "",
+    "completely unrelated words",
+]
+
+
+def positions(results: list) -> list:
+    """Script positions of matched sections (by identity: tied sections are equal dicts)"""
+    return [
+        next(index for index, section in enumerate(SECTIONS) if section is match)
+        for match, _ in results
+    ]
+
+
+class FindRelevantSectionsBatchTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.matcher = SemanticMatcher()
+        cls.matcher.encode_sections(SECTIONS)
+
+    def test_batch_matches_single_lookups(self):
+        for top_k in (0, 1, 2, 3, len(SECTIONS) + 1):
+            with self.subTest(top_k=top_k):
+                batch = self.matcher.find_relevant_sections_batch(QUERIES, top_k=top_k)
+                single = [self.matcher.find_relevant_sections(query, top_k=top_k) for query in QUERIES]
+                self.assertEqual(batch, single)
+                self.assertEqual(list(map(positions, batch)), list(map(positions, single)))
+
+    def test_ties_resolve_by_section_order(self):
+        # Sections 1, 3 and 4 score the same for this query; cut that tied
+        # group at the top-k boundary in both APIs
+        for top_k in (1, 2):
+            with self.subTest(top_k=top_k):
+                (batch,) = self.matcher.find_relevant_sections_batch(["book valuation"], top_k=top_k)
+                single = self.matcher.find_relevant_sections("book valuation", top_k=top_k)
+
+                expected = [1, 3][:top_k]
+                self.assertEqual(positions(batch), expected)
+                self.assertEqual(positions(single), expected)
+
+    def test_empty_batch_and_unencoded_matcher(self):
+        self.assertEqual(self.matcher.find_relevant_sections_batch([]), [])
+        self.assertEqual(SemanticMatcher().find_relevant_sections_batch(["hello", "book"]), [[], []])
+
+
+if __name__ == '__main__':
+    unittest.main()